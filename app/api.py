@@ -1,45 +1,111 @@
-from fastapi import FastAPI, Depends
-from .db import Base, engine, get_db
+import time
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from .db import Base, engine, get_db, get_async_db, SessionLocal, ASYNC_DB
 from sqlalchemy.orm import Session
-from .repository import get_current_config, save_config, get_best_model, save_candidate
+from . import repository_async
+from .repository import save_config, get_best_model, get_model, save_candidate
 from .health import healthcheck
 from .notify import notify
 from .logging_conf import setup_logging
-from .config import StrategyConfig
+from .config import StrategyConfig, Bar
+from .live import live_book
+from .readmodel import read_model
+from . import telemetry
 setup_logging()
 Base.metadata.create_all(bind=engine)
 app = FastAPI(title="Trading Organism API")
 CURRENT_VERSION = "none"
 
+def _load_live_model(db: Session, version: str = None):
+    mv = get_model(db, version) if version else get_best_model(db)
+    if mv is not None:
+        live_book.set_model(mv.version, (mv.metrics or {}).get("params"))
+
+with SessionLocal() as _db:
+    _load_live_model(_db)
+
+if telemetry.registry.enabled:
+    @app.middleware("http")
+    async def _time_requests(request: Request, call_next):
+        t0 = time.perf_counter()
+        response = await call_next(request)
+        # label by route template (/signal/{symbol}), not the raw path
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        telemetry.registry.observe("http_request_seconds", time.perf_counter()-t0, method=request.method, route=route)
+        return response
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+def prometheus():
+    return PlainTextResponse(telemetry.registry.render(), media_type=telemetry.CONTENT_TYPE)
+
+# GET endpoints read the in-memory snapshot on the event loop; see ReadModel for how it stays fresh
 @app.get("/")
-def root(db: Session = Depends(get_db)):
-    cfg = get_current_config(db)
-    best = get_best_model(db)
-    return {"message":"Bot is alive!", "serving_version": CURRENT_VERSION, "best_version": best.version if best else None, "config": cfg.dict()}
+async def root():
+    snap = await read_model.asnapshot()
+    best = snap["best"]
+    return {"message":"Bot is alive!", "serving_version": CURRENT_VERSION, "best_version": best["version"] if best else None, "config": snap["config"].dict()}
 
 @app.get("/health")
-def health(db: Session = Depends(get_db)):
-    return healthcheck(db)
+async def health():
+    return healthcheck(await read_model.asnapshot())
 
 @app.get("/metrics")
-def metrics(db: Session = Depends(get_db)):
-    best = get_best_model(db)
-    return best.metrics if best else {"note":"no model yet"}
+async def metrics():
+    best = (await read_model.asnapshot())["best"]
+    return best["metrics"] if best else {"note":"no model yet"}
 
-@app.post("/reload")
-def reload_model(version: str, db: Session = Depends(get_db)):
+def _reloaded(version: str):
     global CURRENT_VERSION
     CURRENT_VERSION = version
-    notify(f"Reloaded to {version}")
+    read_model.invalidate()
     return {"status":"ok","serving_version":CURRENT_VERSION}
 
-@app.post("/config")
-def update_config(cfg: dict, db: Session = Depends(get_db)):
-    sc = StrategyConfig(**cfg)
-    save_config(db, sc)
-    return {"status":"ok","config":sc.dict()}
+if ASYNC_DB:
+    @app.post("/reload")
+    async def reload_model(version: str, db = Depends(get_async_db)):
+        mv = await repository_async.get_model(db, version)
+        if mv is not None:
+            await run_in_threadpool(live_book.set_model, mv.version, (mv.metrics or {}).get("params"))
+        notify(f"Reloaded to {version}")
+        return _reloaded(version)
+
+    @app.post("/config")
+    async def update_config(cfg: dict, db = Depends(get_async_db)):
+        sc = StrategyConfig(**cfg)
+        await repository_async.save_config(db, sc)
+        read_model.set_config(sc)
+        return {"status":"ok","config":sc.dict()}
+else:
+    @app.post("/reload")
+    def reload_model(version: str, db: Session = Depends(get_db)):
+        _load_live_model(db, version)
+        notify(f"Reloaded to {version}")
+        return _reloaded(version)
+
+    @app.post("/config")
+    def update_config(cfg: dict, db: Session = Depends(get_db)):
+        sc = StrategyConfig(**cfg)
+        save_config(db, sc)
+        read_model.set_config(sc)
+        return {"status":"ok","config":sc.dict()}
 
 @app.get("/best_model")
-def best_model(db: Session = Depends(get_db)):
-    bm = get_best_model(db)
-    return {"version": bm.version, "metrics": bm.metrics} if bm else {}
+async def best_model():
+    bm = (await read_model.asnapshot())["best"]
+    return {"version": bm["version"], "metrics": bm["metrics"]} if bm else {}
+
+@app.post("/bars/{symbol}")
+def ingest_bar(symbol: str, bar: Bar):
+    t0 = time.perf_counter()
+    out = live_book.ingest(symbol, bar.dict())
+    return {"symbol": symbol, **out, "server_us": round((time.perf_counter()-t0)*1e6, 1)}
+
+@app.get("/signal/{symbol}")
+def signal(symbol: str):
+    t0 = time.perf_counter()
+    out = live_book.signal(symbol)
+    if out is None:
+        raise HTTPException(status_code=404, detail=f"no bars for {symbol}")
+    return {"symbol": symbol, **out, "server_us": round((time.perf_counter()-t0)*1e6, 1)}
@@ -1,16 +1,14 @@
-from .strategy import enhanced_backtest_strategy
+from .strategy import run_backtest
+from .scenarios import scenario_batch, scenario_frame
 def _gen_random_walk(n=500, seed=42):
-    import numpy as np
-    import pandas as pd
-    rng = np.random.default_rng(seed)
-    steps = rng.normal(0, 1, n).cumsum()
-    price = 100 + steps
-    high = price + rng.uniform(0,1,n)
-    low = price - rng.uniform(0,1,n)
-    openp = np.roll(price,1); openp[0]=price[0]
-    vol = rng.integers(100, 200, n)
-    return pd.DataFrame({"open":openp,"high":high,"low":low,"close":price,"volume":vol})
+    # single Gaussian path; generation is memoized in app.scenarios
+    return scenario_frame(scenario_batch(n, 1, seed, "gaussian"), 0)
 
-def simulate(df, atr_stop_mult=1.5, atr_take_mult=3.0, risk_per_trade=0.01, seed=0):
-    out = enhanced_backtest_strategy(df, initial_balance=10000.0, risk_per_trade=risk_per_trade)
-    return out['balance']
+def simulate(df, atr_stop_mult=1.5, atr_take_mult=3.0, risk_per_trade=0.01, seed=0, confidence_threshold=0.5,
+             ema_fast=21, ema_slow=50, rsi_low=30, rsi_high=70, max_drawdown=None, htf_factor=0):
+    # with max_drawdown the curve may end early (see backtest_arrays)
+    config = {'atr_stop_mult': atr_stop_mult, 'atr_take_mult': atr_take_mult, 'min_confidence': confidence_threshold,
+              'ema_fast': int(ema_fast), 'ema_slow': int(ema_slow), 'rsi_low': rsi_low, 'rsi_high': rsi_high,
+              'htf_factor': int(htf_factor)}
+    out = run_backtest(df, initial_balance=10000.0, risk_per_trade=risk_per_trade, config=config, max_drawdown=max_drawdown)
+    return out.balance
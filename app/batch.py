@@ -0,0 +1,189 @@
+# Population-batched backtest: every candidate advances through the same bars together.
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from . import telemetry
+from .indicators import indicator_arrays
+from .timeframes import higher_tf_close
+from .strategy import DEFAULT_STRATEGY_CONFIG, raw_signal_arrays
+
+PARAM_COLUMNS = ('atr_stop_mult', 'atr_take_mult', 'risk_per_trade', 'confidence_threshold',
+                 'ema_fast', 'ema_slow', 'rsi_low', 'rsi_high', 'htf_factor')
+# columns 4.. only change the signal; candidates sharing them share one signal series
+SIGNAL_COLUMNS = PARAM_COLUMNS[4:]
+PARAM_DEFAULTS = {
+    'atr_stop_mult': DEFAULT_STRATEGY_CONFIG['atr_stop_mult'],
+    'atr_take_mult': DEFAULT_STRATEGY_CONFIG['atr_take_mult'],
+    'risk_per_trade': 0.01,
+    'confidence_threshold': DEFAULT_STRATEGY_CONFIG['min_confidence'],
+    'ema_fast': 21,
+    'ema_slow': 50,
+    'rsi_low': DEFAULT_STRATEGY_CONFIG['rsi_low'],
+    'rsi_high': DEFAULT_STRATEGY_CONFIG['rsi_high'],
+    'htf_factor': DEFAULT_STRATEGY_CONFIG['htf_factor'],
+}
+
+def params_matrix(population: Sequence[Dict]) -> np.ndarray:
+    """(N x len(PARAM_COLUMNS)) float64 matrix, filling gaps from PARAM_DEFAULTS."""
+    return np.array([[float(p.get(k, PARAM_DEFAULTS[k])) for k in PARAM_COLUMNS] for p in population],
+                    dtype=np.float64).reshape(-1, len(PARAM_COLUMNS))
+
+def batch_backtest_arrays(high: np.ndarray,
+                          low: np.ndarray,
+                          close: np.ndarray,
+                          atr: np.ndarray,
+                          raw_signal: np.ndarray,
+                          confidence: np.ndarray,
+                          params: np.ndarray,
+                          initial_balance: float = 10000.0,
+                          slippage: float = 0.0005,
+                          commission: float = 0.0002,
+                          spread: float = 0.0,
+                          max_drawdown: Optional[float] = None) -> np.ndarray:
+    """Run backtest_arrays for every row of params at once; returns equity of shape (N, n-1).
+
+    raw_signal/confidence are either one series shared by all candidates or
+    (N x n) with a row per candidate. Each row of the result equals
+    backtest_arrays on the same series with that row's parameters and signal cut
+    at its confidence threshold. Only the first four PARAM_COLUMNS are read here.
+
+    With max_drawdown, a candidate stops on the same bar backtest_arrays would
+    abort it; the rest of its row is NaN and it drops out of the per-bar work.
+    """
+    params = np.asarray(params, dtype=np.float64).reshape(len(params), -1)
+    stop_mult, take_mult, risk, threshold = (np.ascontiguousarray(params[:, j]) for j in range(4))
+    k = len(params)
+    n = len(close)
+    equity = np.empty((k, max(n - 1, 0)), dtype=np.float64)
+
+    cash = np.full(k, initial_balance, dtype=np.float64)
+    balance = cash.copy()
+    direction = np.zeros(k, dtype=np.int8)
+    entry_price = np.zeros(k)
+    size = np.zeros(k)
+    stop_price = np.zeros(k)
+    take_price = np.zeros(k)
+    zeros = np.zeros(k)
+    peak = np.full(k, -np.inf)
+    alive = np.arange(k)  # original row of each live candidate
+    h, l, c, a = high.tolist(), low.tolist(), close.tolist(), atr.tolist()
+    per_candidate = np.ndim(raw_signal) == 2
+    if per_candidate:
+        # bar-major so each bar reads one contiguous row
+        sig, conf = np.ascontiguousarray(raw_signal.T), np.ascontiguousarray(confidence.T)
+    else:
+        sig, conf = raw_signal.tolist(), confidence.tolist()
+
+    for i in range(1, n):
+        if direction.any():
+            is_long = direction == 1
+            is_short = direction == -1
+            has_take = take_price != 0
+            long_stop = is_long & (l[i] <= stop_price)
+            long_take = is_long & ~long_stop & (h[i] >= np.where(has_take, take_price, 1e18))
+            short_stop = is_short & (h[i] >= stop_price)
+            short_take = is_short & ~short_stop & (l[i] <= np.where(has_take, take_price, -1e18))
+            long_exit = long_stop | long_take
+            short_exit = short_stop | short_take
+            if long_exit.any() or short_exit.any():
+                take_or_close = np.where(has_take, take_price, c[i])
+                exit_price = np.where(long_stop, stop_price * (1 + slippage),
+                             np.where(long_take, take_or_close * (1 - slippage),
+                             np.where(short_stop, stop_price * (1 - slippage), take_or_close * (1 + slippage))))
+                fee = np.abs(exit_price * size) * commission
+                long_cash = cash + (size * exit_price - fee)
+                pnl = (entry_price - exit_price) * size
+                short_cash = cash + (size * (entry_price + pnl) - fee)
+                cash = np.where(long_exit, long_cash, np.where(short_exit, short_cash, cash))
+                exited = long_exit | short_exit
+                balance = np.where(exited, cash, balance)
+                direction[exited] = 0
+
+        s, conf_i = sig[i], conf[i]
+        if per_candidate and len(alive) < k:
+            s, conf_i = s[alive], conf_i[alive]
+        if per_candidate or s != 0:
+            enter = (direction == 0) & (conf_i >= threshold)
+            if per_candidate:
+                enter &= s != 0
+            if enter.any():
+                close_i, atr_i = c[i], a[i]
+                buy = s == 1
+                # dynamic_position_sizing, vectorized over candidates
+                stop_distance = np.maximum(atr_i * stop_mult, 1e-8)
+                new_size = (balance * risk) / (stop_distance * 1.0)
+                new_size = np.where(new_size <= 0, 0.0, new_size)
+                new_stop = np.where(buy, close_i - stop_mult * atr_i - spread / 2, close_i + stop_mult * atr_i + spread / 2)
+                new_take = np.where(buy, close_i + take_mult * atr_i, close_i - take_mult * atr_i)
+                new_entry = np.where(buy, close_i * (1 + slippage + spread / 2), close_i * (1 - slippage - spread / 2))
+                notional = new_entry * new_size
+                fee = notional * commission
+                enter &= notional + fee <= cash
+                cash = np.where(enter, cash - (notional + fee), cash)
+                direction = np.where(enter, np.where(buy, 1, -1), direction).astype(np.int8)
+                entry_price = np.where(enter, new_entry, entry_price)
+                size = np.where(enter, new_size, size)
+                stop_price = np.where(enter, new_stop, stop_price)
+                take_price = np.where(enter, new_take, take_price)
+
+        unreal = np.where(direction == 1, (c[i] - entry_price) * size,
+                 np.where(direction == -1, (entry_price - c[i]) * size, zeros))
+        eq = cash + unreal
+        if len(alive) == k:
+            equity[:, i - 1] = eq
+        else:
+            equity[alive, i - 1] = eq
+        if max_drawdown is not None:
+            peak = np.maximum(peak, eq)
+            stop = eq / peak - 1 < max_drawdown
+            if stop.any():
+                equity[alive[stop], i:] = np.nan
+                keep = ~stop
+                alive = alive[keep]
+                if not len(alive):
+                    break
+                (cash, balance, direction, entry_price, size, stop_price, take_price, zeros, peak,
+                 stop_mult, take_mult, risk, threshold) = (x[keep] for x in (
+                    cash, balance, direction, entry_price, size, stop_price, take_price, zeros, peak,
+                    stop_mult, take_mult, risk, threshold))
+    return equity
+
+def batch_inputs(df, params: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """Indicator columns plus raw signal/confidence for every params row (shared when all rows agree).
+
+    Signals are computed once per distinct (ema_fast, ema_slow, rsi_low, rsi_high,
+    htf_factor), with the EMAs and higher-timeframe closes read from the
+    indicator cache.
+    """
+    signal_keys = params[:, PARAM_COLUMNS.index(SIGNAL_COLUMNS[0]):]
+    unique_keys, inverse = np.unique(signal_keys, axis=0, return_inverse=True)
+    with telemetry.stage("indicators", engine="batch"):
+        cols = indicator_arrays(df, ema_spans=np.unique(unique_keys[:, :2]).astype(int).tolist())
+    with telemetry.stage("signals", engine="batch"):
+        signals = [raw_signal_arrays(cols, higher_tf_close=higher_tf_close(cols, factor=int(k[4])) if k[4] else None,
+                                     config={'ema_fast': int(k[0]), 'ema_slow': int(k[1]), 'rsi_low': k[2], 'rsi_high': k[3]})
+                   for k in unique_keys]
+        if len(signals) == 1:
+            raw_signal, confidence = signals[0]
+        else:
+            inverse = inverse.reshape(-1)
+            raw_signal = np.stack([sg for sg, _ in signals])[inverse]
+            confidence = np.stack([cf for _, cf in signals])[inverse]
+    return cols, raw_signal, confidence
+
+def batch_backtest(df: pd.DataFrame,
+                   params: np.ndarray,
+                   initial_balance: float = 10000.0,
+                   slippage: float = 0.0005,
+                   commission: float = 0.0002,
+                   spread: float = 0.0,
+                   max_drawdown: Optional[float] = None) -> np.ndarray:
+    """Prepare indicators and signals once for df (batch_inputs), then backtest every parameter row on it."""
+    cols, raw_signal, confidence = batch_inputs(df, params)
+    with telemetry.stage("position_loop", engine="batch"):
+        equity = batch_backtest_arrays(cols['high'], cols['low'], cols['close'], cols['atr'],
+                                       raw_signal, confidence, params, initial_balance=initial_balance,
+                                       slippage=slippage, commission=commission, spread=spread,
+                                       max_drawdown=max_drawdown)
+    telemetry.inc("bars_simulated_total", int(np.count_nonzero(~np.isnan(equity))))
+    return equity
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic import BaseModel
 
 class StrategyConfig(BaseModel):
@@ -10,6 +11,15 @@ class StrategyConfig(BaseModel):
     atr_take_mult:float = 3.0
     risk_per_trade:float = 0.01
     confidence_threshold:float = 0.5
+    htf_factor:int = 0  # >0: confirm trends on bars of this many base bars (see strategy.DEFAULT_STRATEGY_CONFIG)
+
+class Bar(BaseModel):
+    open:float
+    high:float
+    low:float
+    close:float
+    volume:float
+    higher_tf_close:Optional[float] = None
 
 def env(key:str, default:str=""):
     return os.getenv(key, default)
@@ -19,7 +29,36 @@ API_BASE_URL = env("API_BASE_URL", f"http://localhost:{API_PORT}")
 API_RELOAD_ENDPOINT = env("API_RELOAD_ENDPOINT", "/reload")
 PROMOTE_DELTA = float(env("PROMOTE_DELTA", "0.02"))
 MAX_DRAWDOWN_LIMIT = float(env("MAX_DRAWDOWN_LIMIT", "-0.35"))
+# backtests abort once drawdown crosses this (empty disables); defaults to the promotion limit
+_early_stop = env("EARLY_STOP_DRAWDOWN", str(MAX_DRAWDOWN_LIMIT))
+EARLY_STOP_DRAWDOWN = float(_early_stop) if _early_stop else None
 EVOLVE_INTERVAL = int(env("EVOLVE_INTERVAL", "60"))
 POPULATION = int(env("POPULATION", "6"))
 GENERATIONS = int(env("GENERATIONS", "2"))
+BATCH_EVAL = env("BATCH_EVAL", "0") == "1"
+EVAL_WORKERS = int(env("EVAL_WORKERS", "1"))
+SCENARIOS = int(env("SCENARIOS", "1"))
+SCENARIO_MODEL = env("SCENARIO_MODEL", "gaussian")
+# successive halving in evolve_once: comma-separated "bars:scenarios" rungs, e.g.
+# "200:1,400:1,800:3"; each rung keeps the top 1/HALVING_ETA. Empty disables.
+HALVING_RUNGS = [tuple(int(x) for x in r.split(":")) for r in env("HALVING_RUNGS", "").split(",") if r]
+HALVING_ETA = float(env("HALVING_ETA", "3"))
+FITNESS_CACHE = env("FITNESS_CACHE", "1") == "1"
+FITNESS_CACHE_SIZE = int(env("FITNESS_CACHE_SIZE", "4096"))
+READ_MODEL_TTL = float(env("READ_MODEL_TTL", "5"))
+# >0: the generation champion is re-scored on this many scenario paths before the promotion check
+ROBUST_SEEDS = int(env("ROBUST_SEEDS", "0"))
+METRICS_PORT = int(env("METRICS_PORT", "0"))  # worker's Prometheus listener; 0 disables
+# population scoring through the eval_jobs table, so `python worker.py evaluate` replicas share the work.
+# evolve_once picks one mode: HALVING_RUNGS, then BATCH_EVAL, then EVAL_QUEUE; the optuna backend
+# always evaluates locally. The worker logs a warning at startup when EVAL_QUEUE is shadowed.
+EVAL_QUEUE = env("EVAL_QUEUE", "0") == "1"
+EVAL_QUEUE_BATCH = int(env("EVAL_QUEUE_BATCH", "4"))  # jobs claimed per round trip
+EVAL_QUEUE_LEASE = float(env("EVAL_QUEUE_LEASE", "300"))  # seconds before a claimed job is retried elsewhere
+EVAL_QUEUE_ATTEMPTS = int(env("EVAL_QUEUE_ATTEMPTS", "3"))
+EVAL_QUEUE_TIMEOUT = float(env("EVAL_QUEUE_TIMEOUT", "1800"))
+EVAL_QUEUE_POLL = float(env("EVAL_QUEUE_POLL", "1"))
+SEARCH_BACKEND = env("SEARCH_BACKEND", "evolve")
+OPTUNA_STUDY = env("OPTUNA_STUDY", "trading-organism")
+OPTUNA_SEEDS = int(env("OPTUNA_SEEDS", "3"))
 WEBHOOK_URL = env("WEBHOOK_URL", "")
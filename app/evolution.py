@@ -1,19 +1,119 @@
+import math
 import numpy as np
-from typing import Dict
-from .metrics import compute_metrics
-from .backtest import _gen_random_walk, simulate
+from typing import Dict, List, Sequence, Tuple
+from .metrics import compute_metrics, batch_metrics, mean_metrics, METRICS
+from .backtest import simulate
+from .batch import batch_backtest, params_matrix
+from .config import SCENARIOS, SCENARIO_MODEL, EARLY_STOP_DRAWDOWN, HALVING_RUNGS, HALVING_ETA
+from .scenarios import scenario_batch, scenario_path, scenario_windows
+from . import telemetry
 
-def evaluate_candidate(params: Dict, seed:int=0) -> Dict:
-    df = _gen_random_walk(n=800, seed=seed)
+def _finite(x) -> float:
+    # NaN/inf scores (a run stopped on bar 2 has a single return) rank last, keeping the order total
+    x = math.nan if x is None else float(x)
+    return x if math.isfinite(x) else -math.inf
+
+def rank_key(m: Dict):
+    # candidates whose backtest aborted on the drawdown limit rank below every finished one,
+    # and among themselves by how many bars they survived first
+    aborted = bool(m.get('aborted', False))
+    return (not aborted, m.get('len', 0) if aborted else 0, _finite(m['sharpe']))
+
+def sort_key(m: Dict):
+    # full ordering used by evolve_once: rank_key, then the shallower drawdown
+    return (*rank_key(m), -abs(_finite(m['max_drawdown'])))
+
+def evaluate_candidate(params: Dict, seed:int=0, data=None, max_drawdown=EARLY_STOP_DRAWDOWN) -> Dict:
+    # data: a frame or column mapping (e.g. OHLCVStore.slice) to score on instead of
+    # the synthetic walk, which is the same series as _gen_random_walk(n=800, seed=seed)
+    with telemetry.stage("data"):
+        df = data if data is not None else scenario_path(scenario_batch(800, 1, seed, "gaussian"), 0)
     eq = simulate(df,
                   atr_stop_mult=params.get('atr_stop_mult',1.5),
                   atr_take_mult=params.get('atr_take_mult',3.0),
                   risk_per_trade=params.get('risk_per_trade',0.01),
-                  seed=seed)
-    m = compute_metrics(eq, periods_per_year=252)
+                  seed=seed,
+                  confidence_threshold=params.get('confidence_threshold',0.5),
+                  ema_fast=params.get('ema_fast',21),
+                  ema_slow=params.get('ema_slow',50),
+                  rsi_low=params.get('rsi_low',30),
+                  rsi_high=params.get('rsi_high',70),
+                  htf_factor=params.get('htf_factor',0),
+                  max_drawdown=max_drawdown)
+    with telemetry.stage("metrics", engine="single"):
+        m = compute_metrics(eq, periods_per_year=252)
+    telemetry.inc("candidates_evaluated_total")
     m['len']=int(len(eq))
+    if len(eq) < len(df['close']) - 1:
+        m['aborted'] = True
     return m
 
+def _equity_metrics(equity: np.ndarray) -> List[Dict]:
+    # batch rows of aborted candidates are NaN past their stop bar
+    with telemetry.stage("metrics", engine="batch"):
+        cols = batch_metrics(equity, periods_per_year=252)
+    telemetry.inc("candidates_evaluated_total", len(equity))
+    lengths = (~np.isnan(equity)).sum(axis=1)
+    out = []
+    for i, length in enumerate(lengths.tolist()):
+        m = {k: float(cols[k][i]) for k in METRICS}
+        m['len'] = length
+        if length < equity.shape[1]:
+            m['aborted'] = True
+        out.append(m)
+    return out
+
+def evaluate_population(population: Sequence[Dict], seed:int=0, scenarios:int=None, model:str=None,
+                        max_drawdown=EARLY_STOP_DRAWDOWN, bars:int=800) -> List[Dict]:
+    # All candidates share one batch of scenario paths and advance through each
+    # path together; metrics are averaged over paths. With one Gaussian path this
+    # equals evaluate_candidate(params, seed) for each entry. bars < 800 scores on
+    # the leading window of the same paths (see scenario_windows).
+    scenarios = SCENARIOS if scenarios is None else scenarios
+    model = SCENARIO_MODEL if model is None else model
+    with telemetry.stage("data"):
+        paths = scenario_windows(bars, scenarios, seed, model)
+    params = params_matrix(population)
+    per_path = [_equity_metrics(batch_backtest(path, params, max_drawdown=max_drawdown)) for path in paths]
+    if scenarios == 1:
+        return per_path[0]
+    return [mean_metrics(runs) for runs in zip(*per_path)]
+
+def successive_halving(population: Sequence[Dict], seed:int=0, rungs=None, eta:float=None,
+                       model:str=None, evaluate=evaluate_population) -> List[Tuple[Dict, Dict]]:
+    """Score the population on cheap rungs first, advancing only the top 1/eta.
+
+    rungs is a list of (bars, scenarios), cheapest first (HALVING_RUNGS). Every
+    rung but the last keeps at least two candidates so evolve_once can still
+    breed. Returns (params, metrics) for the candidates that reached the last
+    rung, with that rung's metrics. evaluate has evaluate_population's signature
+    (e.g. FitnessCache.population).
+    """
+    rungs = HALVING_RUNGS if rungs is None else rungs
+    eta = HALVING_ETA if eta is None else eta
+    alive = list(population)
+    for r, (bars, scenarios) in enumerate(rungs):
+        metrics = evaluate(alive, seed=seed, scenarios=scenarios, model=model, bars=bars)
+        scored = sorted(zip(alive, metrics), key=lambda x: sort_key(x[1]), reverse=True)
+        if r == len(rungs) - 1:
+            return scored
+        keep = max(2, math.ceil(len(scored) / eta))
+        alive = [p for p, _ in scored[:keep]]
+    return [(p, m) for p, m in zip(alive, evaluate(alive, seed=seed, model=model))]
+
+# Optional search dimensions: mutated only when the candidate carries them.
+SEARCH_BOUNDS = {
+    'ema_fast': (5, 100, int),
+    'ema_slow': (10, 200, int),
+    'rsi_low': (10, 45, int),
+    'rsi_high': (55, 90, int),
+    'confidence_threshold': (0.2, 0.95, float),
+}
+# Discrete ones: switched to a random option with probability `scale`.
+SEARCH_CHOICES = {
+    'htf_factor': (0, 2, 4, 8, 16),
+}
+
 def mutate(params: Dict, scale: float=0.2, rng=None):
     if rng is None:
         rng = np.random.default_rng()
@@ -25,12 +125,21 @@ def mutate(params: Dict, scale: float=0.2, rng=None):
             p[k]=max(0.001, min(0.05, val*noise))
         else:
             p[k]=max(0.5, min(6.0, val*noise))
+    for k,(lo,hi,cast) in SEARCH_BOUNDS.items():
+        if k not in p:
+            continue
+        val = p[k]*(1 + rng.normal(0, scale))
+        p[k]=cast(max(lo, min(hi, round(val) if cast is int else val)))
+    for k,options in SEARCH_CHOICES.items():
+        if k in p and rng.random() < scale:
+            p[k]=int(rng.choice(options))
     return p
 
 def breed(parent_a: Dict, parent_b: Dict, rng=None):
     if rng is None:
         rng = np.random.default_rng()
     child={}
-    for k in set(list(parent_a.keys())+list(parent_b.keys())):
+    # key order fixed (not a set) so a seeded rng breeds the same child in every process
+    for k in dict.fromkeys([*parent_a, *parent_b]):
         child[k] = parent_a.get(k,1.0) if rng.random()<0.5 else parent_b.get(k,1.0)
     return child
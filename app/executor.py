@@ -0,0 +1,48 @@
+# Process pool for spreading candidate evaluations across cores.
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Sequence
+from .config import EVAL_WORKERS
+from .evolution import evaluate_candidate
+
+logger = logging.getLogger(__name__)
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    # The pool is created once and reused across generations and main_loop iterations.
+    global _pool
+    if EVAL_WORKERS <= 1:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EVAL_WORKERS)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def pool_map(fn: Callable, *iterables) -> List:
+    """list(map(fn, *iterables)) on the pool, or in-process without one (or for a single item).
+
+    pool.map yields results in submission order, so results never depend on which
+    worker finishes first. A crashed worker breaks the pool; it is discarded (the
+    next call forks a fresh one) and the error is re-raised for the caller's
+    backoff handling.
+    """
+    iterables = [list(it) for it in iterables]
+    pool = get_pool()
+    if pool is None or min(map(len, iterables), default=0) <= 1:
+        return list(map(fn, *iterables))
+    try:
+        return list(pool.map(fn, *iterables))
+    except BrokenProcessPool:
+        logger.error("Evaluation pool broke; it will be recreated on the next call")
+        shutdown_pool()
+        raise
+
+def evaluate_many(population: Sequence[Dict], seeds: Sequence[int]) -> List[Dict]:
+    """evaluate_candidate(population[i], seeds[i]) for every i, in input order."""
+    return pool_map(evaluate_candidate, population, seeds)
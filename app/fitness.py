@@ -0,0 +1,146 @@
+# Fitness memoization: (quantized params, seed, dataset, code version) -> metrics, in an LRU backed by the fitness_cache table.
+import hashlib, json, logging, os, threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import telemetry
+from .batch import PARAM_COLUMNS, PARAM_DEFAULTS
+from .config import FITNESS_CACHE, FITNESS_CACHE_SIZE, SCENARIOS, SCENARIO_MODEL, EARLY_STOP_DRAWDOWN
+from .evolution import evaluate_candidate, evaluate_population
+from .metrics import json_metrics, metrics_from_json
+from .models import FitnessRecord
+
+logger = logging.getLogger(__name__)
+
+def _code_version() -> str:
+    # everything that can change a score; editing any of these files invalidates old entries
+    h = hashlib.blake2b(digest_size=8)
+    here = os.path.dirname(__file__)
+    for name in ('strategy.py', 'batch.py', 'indicators.py', 'metrics.py', 'scenarios.py', 'backtest.py', 'evolution.py'):
+        with open(os.path.join(here, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+CODE_VERSION = _code_version()
+
+def quantize(params: Dict) -> Dict:
+    """The parameters a backtest actually reads, rounded to 6 significant digits."""
+    return {k: float(f"{float(params.get(k, PARAM_DEFAULTS[k])):.6g}") for k in PARAM_COLUMNS}
+
+def dataset_version(model: str = "gaussian", scenarios: int = 1, bars: int = 800,
+                    max_drawdown: Optional[float] = EARLY_STOP_DRAWDOWN) -> str:
+    return f"{model}:{scenarios}x{bars}:dd={max_drawdown}"
+
+def _key(q: Dict, seed: int, dataset: str) -> str:
+    raw = json.dumps([q, seed, dataset, CODE_VERSION], sort_keys=True)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+class FitnessCache:
+    """In-process LRU in front of the fitness_cache table.
+
+    Lookups hit the LRU first, then the table (one query per batch); misses are
+    evaluated and written to both. Without a session only the LRU is used.
+    """
+
+    def __init__(self, max_entries: int = FITNESS_CACHE_SIZE, enabled: bool = FITNESS_CACHE):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, metrics: Dict):
+        with self._lock:
+            self._entries[key] = metrics
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, keys: Sequence[str], db: Optional[Session] = None) -> Dict[str, Dict]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                m = self._entries.get(key)
+                if m is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = m
+        self.hits += len(found)
+        missing = [k for k in set(keys) if k not in found]
+        if db is not None and missing:
+            rows = db.query(FitnessRecord.key, FitnessRecord.metrics).filter(FitnessRecord.key.in_(missing)).all()
+            for key, metrics in rows:
+                found[key] = metrics_from_json(metrics)
+                self._remember(key, found[key])
+            self.db_hits += len(rows)
+        return found
+
+    def store(self, entries: Sequence[tuple], db: Optional[Session] = None):
+        """entries: (key, quantized params, seed, dataset, metrics)."""
+        for key, _, _, _, metrics in entries:
+            self._remember(key, metrics)
+        if db is None or not entries:
+            return
+        rows = [FitnessRecord(key=key, params=q, seed=seed, dataset=dataset, code_version=CODE_VERSION,
+                              metrics=json_metrics(metrics)) for key, q, seed, dataset, metrics in entries]
+        try:
+            db.add_all(rows)
+            db.commit()
+        except IntegrityError:
+            # another worker stored some of these first; keep whichever rows are still new
+            db.rollback()
+            existing = {k for (k,) in db.query(FitnessRecord.key).filter(FitnessRecord.key.in_([r.key for r in rows]))}
+            db.add_all([FitnessRecord(key=r.key, params=r.params, seed=r.seed, dataset=r.dataset,
+                                      code_version=r.code_version, metrics=r.metrics)
+                        for r in rows if r.key not in existing])
+            db.commit()
+
+    def _evaluate(self, items: Sequence[tuple], evaluate, db: Optional[Session]) -> List[Dict]:
+        # items: (params, seed, dataset); evaluate(misses) -> metrics in the same order
+        if not self.enabled:
+            return evaluate(list(range(len(items))))
+        keyed = []
+        for params, seed, dataset in items:
+            q = quantize(params)
+            keyed.append((_key(q, seed, dataset), q, seed, dataset))
+        found = self.lookup([k[0] for k in keyed], db)
+        todo, seen = [], set()
+        for i, k in enumerate(keyed):
+            if k[0] not in found and k[0] not in seen:
+                seen.add(k[0])
+                todo.append(i)
+        self.misses += len(todo)
+        if todo:
+            fresh = evaluate(todo)
+            self.store([(*keyed[i], m) for i, m in zip(todo, fresh)], db)
+            found.update((keyed[i][0], m) for i, m in zip(todo, fresh))
+        return [dict(found[k[0]]) for k in keyed]
+
+    def candidate(self, params: Dict, seed: int = 0, db: Optional[Session] = None) -> Dict:
+        """evaluate_candidate(params, seed) on the default synthetic walk, memoized."""
+        items = [(params, seed, dataset_version())]
+        return self._evaluate(items, lambda idx: [evaluate_candidate(params, seed=seed)], db)[0]
+
+    def many(self, population: Sequence[Dict], seeds: Sequence[int], db: Optional[Session] = None) -> List[Dict]:
+        """executor.evaluate_many, evaluating only the misses."""
+        from .executor import evaluate_many
+        items = [(p, s, dataset_version()) for p, s in zip(population, seeds)]
+        return self._evaluate(items, lambda idx: evaluate_many([population[i] for i in idx], [seeds[i] for i in idx]), db)
+
+    def population(self, population: Sequence[Dict], seed: int = 0, scenarios: int = None, model: str = None,
+                   bars: int = 800, db: Optional[Session] = None) -> List[Dict]:
+        """evaluate_population, re-simulating only candidates not seen on these paths before."""
+        scenarios = SCENARIOS if scenarios is None else scenarios
+        model = SCENARIO_MODEL if model is None else model
+        dataset = dataset_version(model, scenarios, bars)
+        items = [(p, seed, dataset) for p in population]
+        return self._evaluate(items, lambda idx: evaluate_population([population[i] for i in idx], seed=seed,
+                                                                       scenarios=scenarios, model=model, bars=bars), db)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "db_hits": self.db_hits, "misses": self.misses, "entries": len(self._entries)}
+
+fitness_cache = FitnessCache()
+telemetry.registry.collector(lambda: {f"fitness_cache_{k}": v for k, v in fitness_cache.stats().items()})
@@ -1,5 +1,5 @@
-from sqlalchemy.orm import Session
-from .repository import get_best_model
-def healthcheck(db: Session) -> dict:
-    best = get_best_model(db)
-    return {"status":"ok", "best_model": best.version if best else None}
+from typing import Any, Dict
+def healthcheck(snapshot: Dict[str, Any]) -> dict:
+    # snapshot: ReadModel.snapshot()
+    best = snapshot["best"]
+    return {"status":"ok", "best_model": best["version"] if best else None}
@@ -0,0 +1,151 @@
+# Indicator computation with a content-addressed LRU cache keyed by OHLCV fingerprint + spec.
+import hashlib, os, threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+import numpy as np
+import pandas as pd
+from . import telemetry
+
+OHLCV = ('open', 'high', 'low', 'close', 'volume')
+
+# (column name, indicator name, parameters) as produced by ensure_indicators
+DEFAULT_SPECS: Tuple[Tuple[str, str, Tuple], ...] = (
+    ('ema21', 'ema', (21,)),
+    ('ema50', 'ema', (50,)),
+    ('atr', 'atr', (14,)),
+    ('rsi', 'rsi', (14,)),
+    ('vol_avg', 'vol_avg', (20,)),
+)
+
+def ema(close: np.ndarray, span: int) -> np.ndarray:
+    return pd.Series(close).ewm(span=span, adjust=False).mean().to_numpy()
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> np.ndarray:
+    high, low, close = pd.Series(high), pd.Series(low), pd.Series(close)
+    high_low = high - low
+    high_close = (high - close.shift()).abs()
+    low_close = (low - close.shift()).abs()
+    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    return tr.rolling(window, min_periods=1).mean().to_numpy()
+
+def rsi(close: np.ndarray, span: int = 14) -> np.ndarray:
+    delta = pd.Series(close).diff()
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+    ma_up = up.ewm(span=span, adjust=False).mean()
+    ma_down = down.ewm(span=span, adjust=False).mean()
+    rs = ma_up / (ma_down + 1e-9)
+    return (100 - (100 / (1 + rs))).to_numpy()
+
+def vol_avg(volume: np.ndarray, window: int = 20) -> np.ndarray:
+    return pd.Series(volume).rolling(window, min_periods=1).mean().to_numpy()
+
+def compute_indicator(cols: Dict[str, np.ndarray], name: str, params: Tuple) -> np.ndarray:
+    if name == 'ema':
+        return ema(cols['close'], *params)
+    if name == 'atr':
+        return atr(cols['high'], cols['low'], cols['close'], *params)
+    if name == 'rsi':
+        return rsi(cols['close'], *params)
+    if name == 'vol_avg':
+        return vol_avg(cols['volume'], *params)
+    raise ValueError(f"unknown indicator {name!r}")
+
+def fingerprint(cols: Dict[str, np.ndarray]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for name in OHLCV:
+        if name in cols:
+            a = np.ascontiguousarray(cols[name])
+            h.update(name.encode())
+            h.update(a.dtype.str.encode())
+            h.update(a.shape[0].to_bytes(8, 'little'))
+            h.update(a.data)
+    return h.hexdigest()
+
+class IndicatorCache:
+    """LRU of read-only indicator arrays bounded by total bytes, with hit/miss counters."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, fn: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            arr = self._entries.get(key)
+            if arr is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return arr
+            self.misses += 1
+        arr = np.ascontiguousarray(fn(), dtype=np.float64)
+        arr.setflags(write=False)
+        with self._lock:
+            if key not in self._entries and arr.nbytes <= self.max_bytes:
+                self._entries[key] = arr
+                self._bytes += arr.nbytes
+                while self._bytes > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= old.nbytes
+        return arr
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+indicator_cache = IndicatorCache(int(float(os.getenv("INDICATOR_CACHE_MB", "64")) * 1024 * 1024))
+telemetry.registry.collector(lambda: {f"indicator_cache_{k}": v for k, v in indicator_cache.stats().items()})
+
+def _names(df) -> Iterable[str]:
+    return df.columns if isinstance(df, pd.DataFrame) else df.keys()
+
+def _float_array(values) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+
+def ohlcv_arrays(df) -> Dict[str, np.ndarray]:
+    names = _names(df)
+    return {k: _float_array(df[k]) for k in OHLCV if k in names}
+
+def indicator_arrays(df,
+                     specs=DEFAULT_SPECS,
+                     ema_spans: Iterable[int] = (),
+                     rsi_spans: Iterable[int] = ()) -> Dict[str, np.ndarray]:
+    """OHLCV plus indicator columns as float64 arrays, without copying the frame.
+
+    df may be a DataFrame or a mapping of column arrays (e.g. scenario_path).
+    Columns already present on df are used as-is (like ensure_indicators);
+    missing ones come from the cache, computed on a miss. Extra spans become
+    ema<span>/rsi<span> entries, each cached under the same key as the equivalent
+    spec, so only the spans asked for are ever computed.
+    """
+    names = _names(df)
+    cols = ohlcv_arrays(df)
+    fp = None
+    for column, name, params in specs:
+        if column in names:
+            cols[column] = _float_array(df[column])
+            continue
+        if fp is None:
+            fp = fingerprint(cols)
+        cols[column] = indicator_cache.get_or_compute((fp, name, params), lambda: compute_indicator(cols, name, params))
+    for kind, spans in (('ema', ema_spans), ('rsi', rsi_spans)):
+        for span in spans:
+            column = f"{kind}{int(span)}"
+            if column in cols:
+                continue
+            if column in names:
+                cols[column] = _float_array(df[column])
+                continue
+            if fp is None:
+                fp = fingerprint(cols)
+            params = (int(span),)
+            cols[column] = indicator_cache.get_or_compute((fp, kind, params), lambda: compute_indicator(cols, kind, params))
+    return cols
@@ -0,0 +1,138 @@
+# Evaluation job queue in the eval_jobs table: a coordinator enqueues candidates, any number of worker replicas lease and score them.
+import logging, time, traceback, uuid
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+from . import telemetry
+from .config import EVAL_QUEUE_BATCH, EVAL_QUEUE_LEASE, EVAL_QUEUE_ATTEMPTS, EVAL_QUEUE_TIMEOUT, EVAL_QUEUE_POLL
+from .fitness import fitness_cache
+from .metrics import json_metrics, metrics_from_json
+from .models import EvalJob
+
+logger = logging.getLogger(__name__)
+
+def enqueue(db: Session, population: Sequence[Dict], seeds: Sequence[int], batch: Optional[str] = None) -> str:
+    """One pending job per (params, seed); returns the batch id they share."""
+    batch = batch or uuid.uuid4().hex
+    db.add_all([EvalJob(batch=batch, position=i, params=dict(p), seed=int(s))
+                for i, (p, s) in enumerate(zip(population, seeds))])
+    db.commit()
+    return batch
+
+class Lease(NamedTuple):
+    # plain values captured at claim time: ORM rows expire on commit and would reload whatever token is current
+    id: int
+    claim: str
+    attempts: int
+    params: Dict
+    seed: int
+
+def _claimable(now: float):
+    return or_(EvalJob.status == "pending", and_(EvalJob.status == "running", EvalJob.lease_until < now))
+
+def claim(db: Session, limit: int = EVAL_QUEUE_BATCH, lease: float = EVAL_QUEUE_LEASE,
+          batch: Optional[str] = None, max_attempts: int = EVAL_QUEUE_ATTEMPTS) -> List[Lease]:
+    """Lease up to `limit` pending (or lease-expired) jobs to the caller, oldest first.
+
+    On Postgres the rows are picked FOR UPDATE SKIP LOCKED, so concurrent
+    claimers pass over each other's rows instead of queueing behind them. SQLite
+    has no row locks (the clause compiles away); there the guarded UPDATE
+    serializes on the database write lock and only one claimer wins each row.
+    Jobs whose lease ran out on their last allowed attempt are marked failed.
+    """
+    now = time.time()
+    db.execute(update(EvalJob)
+               .where(EvalJob.status == "running", EvalJob.lease_until < now, EvalJob.attempts >= max_attempts)
+               .values(status="failed", claim=None, error="lease expired"),
+               execution_options={"synchronize_session": False})
+    q = select(EvalJob.id).where(_claimable(now)).order_by(EvalJob.id).limit(limit).with_for_update(skip_locked=True)
+    if batch is not None:
+        q = q.where(EvalJob.batch == batch)
+    ids = list(db.scalars(q))
+    if not ids:
+        db.commit()
+        return []
+    token = uuid.uuid4().hex
+    db.execute(update(EvalJob)
+               .where(EvalJob.id.in_(ids), _claimable(now))
+               .values(status="running", claim=token, lease_until=now + lease, attempts=EvalJob.attempts + 1),
+               execution_options={"synchronize_session": False})
+    db.commit()
+    rows = db.execute(select(EvalJob.id, EvalJob.claim, EvalJob.attempts, EvalJob.params, EvalJob.seed)
+                      .where(EvalJob.claim == token).order_by(EvalJob.id)).all()
+    db.commit()
+    return [Lease(*row) for row in rows]
+
+def complete(db: Session, jobs: Sequence[Lease], results: Sequence[Dict]) -> int:
+    """Store results for jobs still leased to us; a job re-claimed after our lease expired is left alone."""
+    done = 0
+    for j, metrics in zip(jobs, results):
+        done += db.execute(update(EvalJob).where(EvalJob.id == j.id, EvalJob.claim == j.claim)
+                           .values(status="done", claim=None, lease_until=None, metrics=json_metrics(metrics)),
+                           execution_options={"synchronize_session": False}).rowcount
+    db.commit()
+    telemetry.inc("queue_jobs_completed_total", done)
+    return done
+
+def fail(db: Session, jobs: Sequence[Lease], error: str, max_attempts: int = EVAL_QUEUE_ATTEMPTS):
+    """Release jobs after an evaluation error: back to pending, or failed once out of attempts."""
+    for j in jobs:
+        db.execute(update(EvalJob).where(EvalJob.id == j.id, EvalJob.claim == j.claim)
+                   .values(status="failed" if j.attempts >= max_attempts else "pending",
+                           claim=None, lease_until=None, error=error[:1000]),
+                   execution_options={"synchronize_session": False})
+    db.commit()
+    telemetry.inc("queue_jobs_failed_total", len(jobs))
+
+def work(db: Session, limit: int = EVAL_QUEUE_BATCH, batch: Optional[str] = None) -> int:
+    """Claim one batch of jobs, score them through the fitness cache and store the results; returns the jobs claimed."""
+    jobs = claim(db, limit=limit, batch=batch)
+    if not jobs:
+        return 0
+    try:
+        with telemetry.stage("queue_evaluate"):
+            results = fitness_cache.many([j.params for j in jobs], [j.seed for j in jobs], db=db)
+    except Exception as e:
+        db.rollback()
+        fail(db, jobs, f"{type(e).__name__}: {e}")
+        raise
+    complete(db, jobs, results)
+    return len(jobs)
+
+def evaluate_distributed(db: Session, population: Sequence[Dict], seeds: Sequence[int],
+                         timeout: float = EVAL_QUEUE_TIMEOUT, poll: float = EVAL_QUEUE_POLL) -> List[Dict]:
+    """executor.evaluate_many spread over every process running work(), in input order.
+
+    The caller works through its own batch as well, so with no other replica
+    up this degrades to a local evaluation. Raises if a job fails for good or
+    the batch is not finished within timeout; the batch's rows are removed
+    either way.
+    """
+    batch = enqueue(db, population, seeds)
+    deadline = time.time() + timeout
+    try:
+        while True:
+            try:
+                if work(db, batch=batch):
+                    continue
+            except Exception:
+                # work() has released the jobs: retried later, or failed for good (raised below)
+                db.rollback()
+                logger.warning("Evaluation attempt failed:\n%s", traceback.format_exc())
+            counts = dict(db.execute(select(EvalJob.status, func.count()).where(EvalJob.batch == batch)
+                                     .group_by(EvalJob.status)).all())
+            db.commit()
+            if counts.get("failed"):
+                error = db.scalar(select(EvalJob.error).where(EvalJob.batch == batch, EvalJob.status == "failed").limit(1))
+                raise RuntimeError(f"{counts['failed']} evaluation job(s) failed: {error}")
+            if counts.get("done", 0) == len(population):
+                break
+            if time.time() > deadline:
+                raise TimeoutError(f"evaluation batch {batch} unfinished after {timeout:.0f}s: {counts}")
+            time.sleep(poll)
+        rows = db.execute(select(EvalJob.metrics).where(EvalJob.batch == batch).order_by(EvalJob.position)).all()
+        return [metrics_from_json(m) for (m,) in rows]
+    finally:
+        db.rollback()
+        db.execute(delete(EvalJob).where(EvalJob.batch == batch))
+        db.commit()
@@ -0,0 +1,75 @@
+# Per-trade records for backtests, kept in one structured array instead of Python objects.
+from typing import Dict
+import numpy as np
+
+TRADE_DTYPE = np.dtype([
+    ('entry_index', np.int64),
+    ('exit_index', np.int64),
+    ('direction', np.int8),
+    ('reason', np.int8),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('size', np.float64),
+    ('entry_fee', np.float64),
+    ('exit_fee', np.float64),
+    ('pnl', np.float64),      # net of both fees
+])
+
+# exit reasons
+STOP, TAKE, OPEN = 0, 1, 2
+REASONS = ('stop', 'take', 'open')
+
+class TradeLedger:
+    """Append-only TRADE_DTYPE rows in a preallocated buffer that doubles when full."""
+
+    def __init__(self, capacity: int = 64):
+        self._buf = np.zeros(max(int(capacity), 1), dtype=TRADE_DTYPE)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def record(self, entry_index: int, exit_index: int, direction: int, reason: int,
+               entry_price: float, exit_price: float, size: float, entry_fee: float, exit_fee: float):
+        if self._n == len(self._buf):
+            grown = np.zeros(2 * len(self._buf), dtype=TRADE_DTYPE)
+            grown[:self._n] = self._buf
+            self._buf = grown
+        gross = (exit_price - entry_price) * size if direction == 1 else (entry_price - exit_price) * size
+        self._buf[self._n] = (entry_index, exit_index, direction, reason, entry_price, exit_price,
+                              size, entry_fee, exit_fee, gross - entry_fee - exit_fee)
+        self._n += 1
+
+    @property
+    def trades(self) -> np.ndarray:
+        """View of the recorded rows (valid until the next record)."""
+        return self._buf[:self._n]
+
+def trade_stats(trades: np.ndarray, include_open: bool = False) -> Dict[str, float]:
+    """Per-trade summary of a TRADE_DTYPE array; trades still open at the end are skipped unless include_open."""
+    if not include_open:
+        trades = trades[trades['reason'] != OPEN]
+    pnl = trades['pnl']
+    n = len(pnl)
+    if n == 0:
+        return {'trades': 0, 'win_rate': 0.0, 'profit_factor': 0.0, 'expectancy': 0.0,
+                'avg_win': 0.0, 'avg_loss': 0.0, 'avg_hold': 0.0, 'fees': 0.0, 'net_pnl': 0.0}
+    wins = pnl > 0
+    gross_win = float(pnl[wins].sum())
+    gross_loss = float(-pnl[~wins].sum())
+    n_win = int(wins.sum())
+    if gross_loss > 0:
+        profit_factor = gross_win / gross_loss
+    else:
+        profit_factor = float('inf') if gross_win > 0 else 0.0
+    return {
+        'trades': n,
+        'win_rate': n_win / n,
+        'profit_factor': profit_factor,
+        'expectancy': float(pnl.mean()),
+        'avg_win': gross_win / n_win if n_win else 0.0,
+        'avg_loss': -gross_loss / (n - n_win) if n > n_win else 0.0,
+        'avg_hold': float((trades['exit_index'] - trades['entry_index']).mean()),
+        'fees': float((trades['entry_fee'] + trades['exit_fee']).sum()),
+        'net_pnl': float(pnl.sum()),
+    }
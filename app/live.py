@@ -0,0 +1,93 @@
+# In-memory per-symbol live state: streaming indicators plus the promoted model's strategy config.
+import os, threading
+from collections import deque
+from typing import Any, Dict, Optional
+from .streaming import StreamingIndicators
+from .strategy import params_config, strategy_decision
+
+LIVE_HISTORY = int(os.getenv("LIVE_HISTORY", "500"))
+
+class _SymbolState:
+    __slots__ = ('indicators', 'bars', 'signal')
+
+    def __init__(self, indicators: StreamingIndicators, history: int):
+        self.indicators = indicators
+        self.bars = deque(maxlen=history)  # raw bars, replayed when the model's EMA spans change
+        self.signal: Optional[Dict[str, Any]] = None
+
+class LiveSignalBook:
+    """Serves enhanced_strategy_logic decisions for the latest bar of each symbol.
+
+    Everything lives in memory; the model is swapped in by set_model (at startup
+    and on /reload), never looked up per request.
+    """
+
+    def __init__(self, history: int = LIVE_HISTORY):
+        self.history = history
+        self.version: Optional[str] = None
+        self.params: Dict[str, Any] = {}
+        self.config: Dict[str, Any] = {}
+        self._symbols: Dict[str, _SymbolState] = {}
+        self._lock = threading.Lock()
+
+    def _spans(self):
+        return int(self.params.get('ema_fast', 21)), int(self.params.get('ema_slow', 50))
+
+    def _new_indicators(self) -> StreamingIndicators:
+        fast, slow = self._spans()
+        return StreamingIndicators(ema_fast=fast, ema_slow=slow)
+
+    def set_model(self, version: Optional[str], params: Optional[Dict[str, Any]]):
+        with self._lock:
+            old_spans = self._spans()
+            self.version, self.params = version, dict(params or {})
+            self.config = params_config(self.params)
+            rebuild = self._spans() != old_spans
+            for state in self._symbols.values():
+                if rebuild:
+                    state.indicators = self._new_indicators()
+                    for bar in state.bars:
+                        state.indicators.update(bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'])
+                if state.bars:
+                    state.signal = self._decide(state)
+
+    def _decide(self, state: _SymbolState) -> Dict[str, Any]:
+        ind = state.indicators
+        last = ind.last
+        out = {'model_version': self.version, 'bars': ind.count, 'close': last['close'], 'atr': last['atr'],
+               'signal': 0, 'confidence': 0.0, 'stop': None, 'take': None}
+        if ind.prev is None:
+            return out
+        htf = state.bars[-1].get('higher_tf_close')
+        factor = self.config.get('htf_factor')
+        if htf is None and factor:
+            # close of the last completed group of `factor` bars, as higher_tf_close() maps it in backtests
+            last_done = (ind.count // factor) * factor - 1
+            pos = last_done - (ind.count - len(state.bars))
+            if last_done >= 0 and pos >= 0:
+                htf = state.bars[pos]['close']
+        signal, meta = strategy_decision(last, ind.prev, higher_tf_close=htf, config=self.config)
+        out['signal'], out['confidence'] = signal, meta['confidence']
+        if signal != 0:
+            out['stop'] = last['close'] - signal * meta['stop_atr_mult'] * last['atr']
+            out['take'] = last['close'] + signal * meta['take_atr_mult'] * last['atr']
+        return out
+
+    def ingest(self, symbol: str, bar: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                state = self._symbols[symbol] = _SymbolState(self._new_indicators(), self.history)
+            state.bars.append(bar)
+            state.indicators.update(bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'])
+            state.signal = self._decide(state)
+            return state.signal
+
+    def signal(self, symbol: str) -> Optional[Dict[str, Any]]:
+        state = self._symbols.get(symbol)
+        return state.signal if state is not None else None
+
+    def symbols(self):
+        return sorted(self._symbols)
+
+live_book = LiveSignalBook()
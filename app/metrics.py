@@ -1,3 +1,4 @@
+import math
 import numpy as np
 import pandas as pd
 
@@ -18,3 +19,161 @@ def compute_metrics(equity: pd.Series, periods_per_year: int = 252) -> dict:
     years = len(equity)/periods_per_year
     cagr = (equity.iloc[-1]/equity.iloc[0])**(1/max(years,1e-9)) - 1
     return {"cagr":float(cagr), "sharpe":float(sharpe), "sortino":float(sortino), "max_drawdown":float(dd), "winrate":float(winrate)}
+
+METRICS = ("cagr", "sharpe", "sortino", "max_drawdown", "winrate")
+
+def mean_metrics(runs, spread: bool = False) -> dict:
+    """compute_metrics keys and 'len' (bars per run) averaged over runs; 'aborted' if any run aborted.
+
+    With spread, also <key>_min (worst case) and <key>_std (dispersion) per
+    metric, and 'windows', the number of runs.
+    """
+    out = {}
+    for k in METRICS:
+        values = np.array([r[k] for r in runs], dtype=np.float64)
+        out[k] = float(values.mean())
+        if spread:
+            out[f"{k}_min"] = float(values.min())
+            out[f"{k}_std"] = float(values.std())
+    out['len'] = float(np.mean([r['len'] for r in runs]))
+    if spread:
+        out['windows'] = len(runs)
+    if any(r.get('aborted') for r in runs):
+        out['aborted'] = True
+    return out
+
+def json_metrics(metrics: dict) -> dict:
+    # JSON has no NaN/Infinity (Postgres rejects them); stored as null, nested dicts included
+    out = {}
+    for k, v in metrics.items():
+        if isinstance(v, dict):
+            v = json_metrics(v)
+        elif isinstance(v, float) and not math.isfinite(v):
+            v = None
+        out[k] = v
+    return out
+
+def metrics_from_json(metrics: dict) -> dict:
+    return {k: (math.nan if v is None else v) for k, v in metrics.items()}
+
+def _ratio(a: float, b: float) -> float:
+    # a / b with numpy's float semantics instead of ZeroDivisionError
+    if b == 0:
+        return math.nan if a == 0 or a != a else math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+class MetricsAccumulator:
+    """compute_metrics fed one equity value at a time, in O(1) memory.
+
+    Returns are tracked with Welford's mean/variance (all and negative-only),
+    alongside the running peak, worst drawdown and win count. compute_metrics
+    takes two passes over the returns, so the two agree to floating-point
+    rounding rather than bit for bit.
+    """
+    __slots__ = ('periods_per_year', 'n', 'first', 'last', 'peak', 'dd',
+                 'count', 'mean', 'm2', 'neg_count', 'neg_mean', 'neg_m2', 'wins')
+
+    def __init__(self, periods_per_year: int = 252):
+        self.periods_per_year = periods_per_year
+        self.n = 0
+        self.first = self.last = self.peak = math.nan
+        self.dd = math.inf
+        self.count = self.neg_count = self.wins = 0
+        self.mean = self.m2 = self.neg_mean = self.neg_m2 = 0.0
+
+    def update(self, equity: float):
+        equity = float(equity)
+        if self.n == 0:
+            self.first = equity
+        else:
+            r = _ratio(equity, self.last) - 1
+            if r == r:
+                self.count += 1
+                delta = r - self.mean
+                self.mean += delta / self.count
+                self.m2 += delta * (r - self.mean)
+                if r < 0:
+                    self.neg_count += 1
+                    delta = r - self.neg_mean
+                    self.neg_mean += delta / self.neg_count
+                    self.neg_m2 += delta * (r - self.neg_mean)
+                self.wins += r > 0
+        if equity == equity:
+            self.peak = equity if not self.peak >= equity else self.peak
+            self.dd = min(self.dd, _ratio(equity, self.peak) - 1)
+        self.last = equity
+        self.n += 1
+
+    def result(self) -> dict:
+        if self.count == 0:
+            return {"cagr":0, "sharpe":0, "sortino":0, "max_drawdown":0, "winrate":0}
+        ppy = self.periods_per_year
+        avg = self.mean * ppy
+        vol = math.sqrt(self.m2 / (self.count - 1)) * math.sqrt(ppy) if self.count > 1 else math.nan
+        if self.neg_count == 0:
+            dvol = 0
+        else:
+            dvol = math.sqrt(self.neg_m2 / (self.neg_count - 1)) * math.sqrt(ppy) if self.neg_count > 1 else math.nan
+        years = self.n / ppy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cagr = (np.float64(self.last) / self.first) ** (1 / max(years, 1e-9)) - 1
+        return {"cagr": float(cagr), "sharpe": float(avg / (vol + 1e-9)), "sortino": float(avg / (dvol + 1e-9)),
+                "max_drawdown": float(self.dd), "winrate": self.wins / self.count}
+
+def _std(values: np.ndarray) -> np.ndarray:
+    # rowwise Series.std() (ddof=1): two-pass, in the order pandas' nanops sums
+    count = values.shape[1]
+    avg = values.sum(axis=1, dtype=np.float64) / count
+    sqr = (avg[:, None] - values) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(sqr.sum(axis=1, dtype=np.float64) / (count - 1))
+
+def batch_metrics(equity: np.ndarray, periods_per_year: int = 252) -> dict:
+    """compute_metrics for every row of an (N x T) equity matrix.
+
+    Returns a dict of (N,) arrays keyed like compute_metrics. Rows may end in a
+    NaN tail (aborted batch_backtest runs); only the leading valid part counts.
+    Rows sharing a length are reduced together with the same summation order
+    pandas uses, so the results equal compute_metrics exactly.
+    """
+    equity = np.atleast_2d(np.asarray(equity, dtype=np.float64))
+    out = {k: np.zeros(equity.shape[0]) for k in METRICS}
+    lengths = (~np.isnan(equity)).cumprod(axis=1).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for length in np.unique(lengths):
+            if length >= 2:
+                _same_length(out, np.flatnonzero(lengths == length), equity[:, :length], periods_per_year)
+    return out
+
+def _same_length(out: dict, rows: np.ndarray, equity: np.ndarray, periods_per_year: int):
+    eq = np.ascontiguousarray(equity[rows])
+    r = eq[:, 1:] / eq[:, :-1] - 1
+    bad = np.isnan(r).any(axis=1)
+    for i in rows[bad]:
+        # NaN returns mid-curve (e.g. 0/0) are dropped by compute_metrics; rare, so use it directly
+        m = compute_metrics(pd.Series(equity[i]), periods_per_year)
+        for k in METRICS:
+            out[k][i] = m[k]
+    rows, eq, r = rows[~bad], eq[~bad], r[~bad]
+    if not len(rows):
+        return
+    sq = np.sqrt(periods_per_year)
+    count = r.shape[1]
+    avg = r.sum(axis=1, dtype=np.float64) / count * periods_per_year
+    vol = _std(r) * sq
+    out["sharpe"][rows] = avg / (vol + 1e-9)
+    # downside deviation needs each row's negatives packed in order; group by how many there are
+    neg = r < 0
+    n_neg = neg.sum(axis=1)
+    packed = np.take_along_axis(r, np.argsort(~neg, axis=1, kind='stable'), axis=1)
+    dvol = np.zeros(len(rows))
+    for k in np.unique(n_neg[n_neg > 0]):
+        sel = n_neg == k
+        dvol[sel] = _std(np.ascontiguousarray(packed[sel, :k])) * sq
+    out["sortino"][rows] = avg / (dvol + 1e-9)
+    out["max_drawdown"][rows] = (eq / np.maximum.accumulate(eq, axis=1) - 1).min(axis=1)
+    out["winrate"][rows] = (r > 0).sum(axis=1) / count
+    years = eq.shape[1] / periods_per_year
+    # scalar pow: numpy's vectorised power can differ from it in the last bit
+    exponent = 1 / max(years, 1e-9)
+    out["cagr"][rows] = [g ** exponent - 1 for g in eq[:, -1] / eq[:, 0]]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from .db import Base
 
@@ -22,3 +22,30 @@ class EvolutionLog(Base):
     message = Column(String, nullable=False)
     data = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class FitnessRecord(Base):
+    __tablename__ = "fitness_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True)
+    params = Column(JSON, nullable=False)
+    seed = Column(Integer, nullable=False)
+    dataset = Column(String, nullable=False)
+    code_version = Column(String, nullable=False)
+    metrics = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EvalJob(Base):
+    __tablename__ = "eval_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    batch = Column(String, nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    params = Column(JSON, nullable=False)
+    seed = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claim = Column(String, nullable=True)  # token of the worker holding the lease
+    lease_until = Column(Float, nullable=True)  # epoch seconds
+    metrics = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (Index("ix_eval_jobs_status_lease", "status", "lease_until"),)
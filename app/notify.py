@@ -1,10 +1,99 @@
-import os, requests
+# Webhook notifications sent from a background thread: callers only enqueue.
+import atexit, logging, os, queue, random, threading, time
+from typing import Optional
+import requests
+
+logger = logging.getLogger(__name__)
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "1000"))
+NOTIFY_BATCH = int(os.getenv("NOTIFY_BATCH", "20"))
+NOTIFY_LINGER = float(os.getenv("NOTIFY_LINGER", "0.5"))  # seconds to wait for a burst to coalesce
+NOTIFY_RETRIES = int(os.getenv("NOTIFY_RETRIES", "3"))
+
+class NotifyDispatcher:
+    """Bounded queue drained by one daemon thread over a pooled requests.Session.
+
+    Messages arriving within NOTIFY_LINGER of each other go out as one POST:
+    a single message keeps the {"text", "extra"} payload, a burst becomes
+    {"text": <lines joined>, "extra": {"batch": [...]}}. Failed posts are
+    retried with exponential backoff and jitter. When the queue is full new
+    messages are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, maxsize: int = NOTIFY_QUEUE_SIZE, batch: int = NOTIFY_BATCH,
+                 linger: float = NOTIFY_LINGER, retries: int = NOTIFY_RETRIES):
+        self.batch, self.linger, self.retries = batch, linger, retries
+        self.sent = self.dropped = self.failed = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._session: Optional[requests.Session] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, url: str, payload: dict):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((url, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._session = requests.Session()
+                self._thread = threading.Thread(target=self._run, name="notify", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.linger
+            while len(items) < self.batch:
+                try:
+                    items.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            by_url = {}
+            for url, payload in items:
+                by_url.setdefault(url, []).append(payload)
+            for url, payloads in by_url.items():
+                self._post(url, payloads)
+            for _ in items:
+                self._queue.task_done()
+
+    def _post(self, url: str, payloads: list):
+        if len(payloads) == 1:
+            body = payloads[0]
+        else:
+            body = {"text": "\n".join(p["text"] for p in payloads), "extra": {"batch": payloads}}
+        for attempt in range(self.retries + 1):
+            try:
+                r = self._session.post(url, json=body, timeout=5)
+                if r.status_code < 500 and r.status_code != 429:
+                    self.sent += len(payloads)
+                    return
+            except Exception:
+                pass
+            if attempt < self.retries:
+                time.sleep(min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+        self.failed += len(payloads)
+        logger.warning("Dropped %d notification(s) after %d attempts", len(payloads), self.retries + 1)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far was sent (or gave up); False on timeout."""
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+dispatcher = NotifyDispatcher()
+atexit.register(dispatcher.flush)
+
 def notify(text:str, extra:dict=None):
     url = os.getenv("WEBHOOK_URL", "")
     if not url:
         return
-    payload = {"text": text, "extra": extra or {}}
-    try:
-        requests.post(url, json=payload, timeout=5)
-    except Exception:
-        pass
+    dispatcher.submit(url, {"text": text, "extra": extra or {}})
@@ -0,0 +1,158 @@
+# Multi-symbol backtest: (symbols x bars) arrays advanced together against one shared cash pool.
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from . import telemetry
+from .indicators import indicator_arrays
+from .strategy import DEFAULT_STRATEGY_CONFIG, config_spans, signal_arrays
+from .timeframes import higher_tf_close
+
+@dataclass
+class PortfolioResult:
+    symbols: Sequence[str]
+    equity: np.ndarray          # (n-1,) portfolio equity
+    symbol_equity: np.ndarray   # (S, n-1) each symbol's cash flows so far plus its unrealized PnL
+    position: np.ndarray        # (S, n-1) int8 direction held at the close of each bar
+    start: int = 1
+
+    def frame(self) -> pd.DataFrame:
+        index = pd.RangeIndex(self.start, self.start + len(self.equity))
+        out = pd.DataFrame({'equity': self.equity}, index=index)
+        for s, row in zip(self.symbols, self.symbol_equity):
+            out[f'equity_{s}'] = row
+        return out
+
+def portfolio_arrays(high: np.ndarray,
+                     low: np.ndarray,
+                     close: np.ndarray,
+                     atr: np.ndarray,
+                     signal: np.ndarray,
+                     risk: np.ndarray,
+                     initial_balance: float = 10000.0,
+                     slippage: float = 0.0005,
+                     commission: float = 0.0002,
+                     spread: float = 0.0,
+                     atr_stop_mult: float = 1.5,
+                     atr_take_mult: float = 3.0):
+    """backtest_arrays over (S x n) inputs with one cash balance; risk is the (S,) risk per trade.
+
+    Every bar, stops and takes are resolved for all symbols at once and their
+    proceeds credited to the shared cash. New entries are then sized from the
+    portfolio balance and filled in symbol order while cash covers them. With
+    one symbol the equity equals backtest_arrays exactly.
+    """
+    S, n = close.shape
+    m = max(n - 1, 0)
+    equity = np.empty(m, dtype=np.float64)
+    symbol_equity = np.empty((S, m), dtype=np.float64)
+    position = np.zeros((S, m), dtype=np.int8)
+    # bar-major so each bar reads contiguous rows
+    H, L, C, A, SIG = (np.ascontiguousarray(x.T) for x in (high, low, close, atr, signal))
+
+    cash = balance = float(initial_balance)
+    flows = np.zeros(S)  # cash each symbol has added (exits) or taken (entries) so far
+    direction = np.zeros(S, dtype=np.int8)
+    entry_price = np.zeros(S)
+    size = np.zeros(S)
+    stop_price = np.zeros(S)
+    take_price = np.zeros(S)
+    zeros = np.zeros(S)
+    for i in range(1, n):
+        h, l, c = H[i], L[i], C[i]
+        if direction.any():
+            is_long = direction == 1
+            is_short = direction == -1
+            has_take = take_price != 0
+            long_stop = is_long & (l <= stop_price)
+            long_take = is_long & ~long_stop & (h >= np.where(has_take, take_price, 1e18))
+            short_stop = is_short & (h >= stop_price)
+            short_take = is_short & ~short_stop & (l <= np.where(has_take, take_price, -1e18))
+            long_exit = long_stop | long_take
+            exited = long_exit | short_stop | short_take
+            if exited.any():
+                take_or_close = np.where(has_take, take_price, c)
+                exit_price = np.where(long_stop, stop_price * (1 + slippage),
+                             np.where(long_take, take_or_close * (1 - slippage),
+                             np.where(short_stop, stop_price * (1 - slippage), take_or_close * (1 + slippage))))
+                fee = np.abs(exit_price * size) * commission
+                pnl = (entry_price - exit_price) * size
+                proceeds = np.where(long_exit, size * exit_price - fee, size * (entry_price + pnl) - fee)
+                for j in np.flatnonzero(exited).tolist():
+                    cash += proceeds[j]
+                flows = np.where(exited, flows + proceeds, flows)
+                balance = cash
+                direction[exited] = 0
+
+        sig = SIG[i]
+        enter = (direction == 0) & (sig != 0)
+        if enter.any():
+            a = A[i]
+            buy = sig == 1
+            # dynamic_position_sizing against the portfolio balance, vectorized over symbols
+            stop_distance = np.maximum(a * atr_stop_mult, 1e-8)
+            new_size = (balance * risk) / (stop_distance * 1.0)
+            new_size = np.where(new_size <= 0, 0.0, new_size)
+            new_stop = np.where(buy, c - atr_stop_mult * a - spread / 2, c + atr_stop_mult * a + spread / 2)
+            new_take = np.where(buy, c + atr_take_mult * a, c - atr_take_mult * a)
+            new_entry = np.where(buy, c * (1 + slippage + spread / 2), c * (1 - slippage - spread / 2))
+            notional = new_entry * new_size
+            fee = notional * commission
+            for j in np.flatnonzero(enter).tolist():
+                if notional[j] + fee[j] <= cash:
+                    cash -= notional[j] + fee[j]
+                    flows[j] -= notional[j] + fee[j]
+                    direction[j] = 1 if buy[j] else -1
+                    entry_price[j], size[j], stop_price[j], take_price[j] = new_entry[j], new_size[j], new_stop[j], new_take[j]
+
+        unreal = np.where(direction == 1, (c - entry_price) * size,
+                 np.where(direction == -1, (entry_price - c) * size, zeros))
+        equity[i - 1] = cash + unreal.sum()
+        symbol_equity[:, i - 1] = flows + unreal
+        position[:, i - 1] = direction
+    return equity, symbol_equity, position
+
+def portfolio_backtest(data: Mapping[str, Union[pd.DataFrame, Mapping[str, np.ndarray]]],
+                       initial_balance: float = 10000.0,
+                       risk_per_trade: float = 0.01,
+                       risk_budget: Optional[Mapping[str, float]] = None,
+                       slippage: float = 0.0005,
+                       commission: float = 0.0002,
+                       spread: float = 0.0,
+                       config: Optional[Dict[str, Any]] = None) -> PortfolioResult:
+    """Backtest one strategy config on every symbol of data with a shared cash pool.
+
+    data maps symbol -> frame or column mapping (e.g. OHLCVStore.slice), all
+    covering the same bars. A symbol's risk per trade is risk_per_trade times
+    its risk_budget weight (default 1). Indicators and signals are computed per
+    symbol (through the indicator cache); the position loop then steps all
+    symbols together.
+    """
+    symbols = list(data)
+    if not symbols:
+        raise ValueError("no symbols")
+    cfg = dict(DEFAULT_STRATEGY_CONFIG)
+    if config:
+        cfg.update(config)
+    ema_spans, rsi_spans = config_spans(cfg)
+    cols, signals = [], []
+    with telemetry.stage("indicators", engine="portfolio"):
+        for s in symbols:
+            cols.append(indicator_arrays(data[s], ema_spans=ema_spans, rsi_spans=rsi_spans))
+    lengths = {len(c['close']) for c in cols}
+    if len(lengths) != 1:
+        raise ValueError(f"symbols cover different bar counts {sorted(lengths)}; align them first")
+    with telemetry.stage("signals", engine="portfolio"):
+        for c in cols:
+            htf = higher_tf_close(c, factor=cfg['htf_factor']) if cfg['htf_factor'] else None
+            signals.append(signal_arrays(c, higher_tf_close=htf, config=config)[0])
+    budget = risk_budget or {}
+    risk = np.array([risk_per_trade * float(budget.get(s, 1.0)) for s in symbols], dtype=np.float64)
+    stack = lambda name: np.stack([c[name] for c in cols])
+    with telemetry.stage("position_loop", engine="portfolio"):
+        equity, symbol_equity, position = portfolio_arrays(
+            stack('high'), stack('low'), stack('close'), stack('atr'), np.stack(signals), risk,
+            initial_balance=initial_balance, slippage=slippage, commission=commission, spread=spread,
+            atr_stop_mult=cfg['atr_stop_mult'], atr_take_mult=cfg['atr_take_mult'])
+    telemetry.inc("bars_simulated_total", position.size)
+    return PortfolioResult(symbols=symbols, equity=equity, symbol_equity=symbol_equity, position=position)
@@ -0,0 +1,83 @@
+# Cached read side of the API: current config and best model snapshot, served from memory.
+import asyncio, threading, time
+from typing import Any, Dict, Optional
+from .config import READ_MODEL_TTL, StrategyConfig
+from .db import ASYNC_DB, SessionLocal, get_async_sessionmaker
+from .repository import best_model_id, get_best_model, peek_current_config
+from . import repository_async
+
+class ReadModel:
+    """Snapshot of the strategy config and the best promoted model.
+
+    Reads come from memory. Once a snapshot is older than ttl seconds the next
+    read re-checks the database: the config row and the id of the newest
+    promoted model are fetched, and the model's metrics are re-read only when
+    that id moved. /config and /reload update or invalidate it directly, so the
+    API's own writes are visible immediately; the TTL catches the worker's.
+    Async handlers use asnapshot, which never blocks the event loop.
+    """
+
+    def __init__(self, ttl: float = READ_MODEL_TTL, session_factory=SessionLocal):
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.config: Optional[StrategyConfig] = None
+        self.best: Optional[Dict[str, Any]] = None
+        self._best_id: Optional[int] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._alock = asyncio.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._checked = 0.0
+
+    def set_config(self, cfg: StrategyConfig):
+        with self._lock:
+            self.config = cfg
+
+    def _stale(self) -> bool:
+        return self.config is None or time.monotonic() - self._checked >= self.ttl
+
+    def _apply(self, config: StrategyConfig, best_id: Optional[int], mv):
+        self.config = config
+        if best_id is None:
+            self.best = None
+        elif mv is not None:
+            self.best = {"id": mv.id, "version": mv.version, "metrics": mv.metrics}
+        self._best_id = best_id
+        self._checked = time.monotonic()
+
+    def _needs_best(self, best_id: Optional[int]) -> bool:
+        return best_id is not None and (best_id != self._best_id or self.best is None)
+
+    def _refresh(self):
+        with self.session_factory() as db:
+            best_id = best_model_id(db)
+            mv = get_best_model(db) if self._needs_best(best_id) else None
+            self._apply(peek_current_config(db), best_id, mv)
+
+    async def _arefresh(self):
+        async with get_async_sessionmaker()() as db:
+            best_id = await repository_async.best_model_id(db)
+            mv = await repository_async.get_best_model(db) if self._needs_best(best_id) else None
+            config = await repository_async.peek_current_config(db)
+        with self._lock:
+            self._apply(config, best_id, mv)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._stale():
+                self._refresh()
+            return {"config": self.config, "best": self.best}
+
+    async def asnapshot(self) -> Dict[str, Any]:
+        if self._stale():
+            async with self._alock:
+                if self._stale():
+                    if ASYNC_DB:
+                        await self._arefresh()
+                    else:
+                        await asyncio.to_thread(self.snapshot)
+        return {"config": self.config, "best": self.best}
+
+read_model = ReadModel()
@@ -1,7 +1,9 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
 from .models import ModelVersion, ConfigKV
 from .config import StrategyConfig
+from .metrics import json_metrics
 
 def get_current_config(db: Session) -> StrategyConfig:
     row = db.query(ConfigKV).filter(ConfigKV.key == "strategy_config").first()
@@ -13,6 +15,11 @@ def get_current_config(db: Session) -> StrategyConfig:
         db.refresh(row)
     return StrategyConfig(**row.value)
 
+def peek_current_config(db: Session) -> StrategyConfig:
+    # read-only get_current_config: defaults when the row does not exist yet
+    row = db.query(ConfigKV).filter(ConfigKV.key == "strategy_config").first()
+    return StrategyConfig(**row.value) if row is not None else StrategyConfig()
+
 def save_config(db: Session, cfg: StrategyConfig):
     row = db.query(ConfigKV).filter(ConfigKV.key == "strategy_config").first()
     if row is None:
@@ -25,8 +32,14 @@ def save_config(db: Session, cfg: StrategyConfig):
 def get_best_model(db: Session):
     return db.query(ModelVersion).filter(ModelVersion.promoted==True).order_by(ModelVersion.id.desc()).first()
 
+def best_model_id(db: Session) -> Optional[int]:
+    return db.query(func.max(ModelVersion.id)).filter(ModelVersion.promoted==True).scalar()
+
+def get_model(db: Session, version: str):
+    return db.query(ModelVersion).filter(ModelVersion.version==version).first()
+
 def save_candidate(db: Session, version: str, metrics: Dict[str, Any], promote: bool=False):
-    mv = ModelVersion(version=version, metrics=metrics, promoted=promote)
+    mv = ModelVersion(version=version, metrics=json_metrics(metrics), promoted=promote)
     db.add(mv)
     db.commit()
     db.refresh(mv)
@@ -0,0 +1,31 @@
+# AsyncSession versions of the repository functions used by the API (ASYNC_DB=1).
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from .models import ModelVersion, ConfigKV
+from .config import StrategyConfig
+
+async def _config_row(db: AsyncSession) -> Optional[ConfigKV]:
+    return (await db.execute(select(ConfigKV).where(ConfigKV.key == "strategy_config"))).scalars().first()
+
+async def peek_current_config(db: AsyncSession) -> StrategyConfig:
+    row = await _config_row(db)
+    return StrategyConfig(**row.value) if row is not None else StrategyConfig()
+
+async def save_config(db: AsyncSession, cfg: StrategyConfig):
+    row = await _config_row(db)
+    if row is None:
+        db.add(ConfigKV(key="strategy_config", value=cfg.dict()))
+    else:
+        row.value = cfg.dict()
+    await db.commit()
+
+async def get_best_model(db: AsyncSession):
+    stmt = select(ModelVersion).where(ModelVersion.promoted==True).order_by(ModelVersion.id.desc()).limit(1)
+    return (await db.execute(stmt)).scalars().first()
+
+async def best_model_id(db: AsyncSession) -> Optional[int]:
+    return (await db.execute(select(func.max(ModelVersion.id)).where(ModelVersion.promoted==True))).scalar()
+
+async def get_model(db: AsyncSession, version: str):
+    return (await db.execute(select(ModelVersion).where(ModelVersion.version==version))).scalars().first()
@@ -0,0 +1,54 @@
+# Robustness scoring: each candidate over many walk-forward windows and/or scenario paths.
+from typing import Dict, List, Optional, Sequence, Tuple
+from .batch import batch_backtest_arrays, batch_inputs, params_matrix
+from .config import EARLY_STOP_DRAWDOWN, SCENARIO_MODEL
+from .evolution import _equity_metrics
+from .executor import pool_map
+from .metrics import mean_metrics
+from .scenarios import scenario_windows
+
+def walk_forward_windows(n: int, train: int, test: int, step: int = None) -> List[Tuple[int, int]]:
+    """[start, stop) test windows of `test` bars, each after at least `train` bars, every `step` (default test) bars."""
+    step = step or test
+    return [(lo, lo + test) for lo in range(max(train, 1), n - test + 1, step)]
+
+def _score_window(task) -> List[Dict]:
+    high, low, close, atr, raw_signal, confidence, params, max_drawdown = task
+    equity = batch_backtest_arrays(high, low, close, atr, raw_signal, confidence, params, max_drawdown=max_drawdown)
+    return _equity_metrics(equity)
+
+def robust_population(population: Sequence[Dict], data=None, seeds: int = 1, seed: int = 0, model: str = None,
+                      train: int = 0, test: Optional[int] = None, step: Optional[int] = None,
+                      max_drawdown=EARLY_STOP_DRAWDOWN, bars: int = 800) -> List[Dict]:
+    """Aggregated metrics per candidate over every (series, window) pair.
+
+    The series are `data` (a frame or column mapping) or, without it, `seeds`
+    scenario paths of `bars` bars. With `test` each series is cut into rolling
+    walk-forward windows; otherwise the whole series is one window. Indicators
+    and signals are computed once per series on its full length, so a window
+    sees exactly the values a run over the whole series would, and each window
+    starts from a fresh balance. The (series, window) tasks are spread over the
+    EVAL_WORKERS pool, each running the whole population in one batched pass.
+    """
+    params = params_matrix(population)
+    if data is not None:
+        series = [data]
+    else:
+        series = scenario_windows(bars, seeds, seed, SCENARIO_MODEL if model is None else model)
+    tasks = []
+    for s in series:
+        cols, raw_signal, confidence = batch_inputs(s, params)
+        n = len(cols['close'])
+        windows = walk_forward_windows(n, train, test, step) if test else [(1, n)]
+        for lo, hi in windows:
+            # bar lo-1 seeds the window, as bar 0 does for a whole-series run
+            w = slice(lo - 1, hi)
+            tasks.append((cols['high'][w], cols['low'][w], cols['close'][w], cols['atr'][w],
+                          raw_signal[..., w], confidence[..., w], params, max_drawdown))
+    if not tasks:
+        raise ValueError("no walk-forward window fits the series")
+    results = pool_map(_score_window, tasks)
+    return [mean_metrics(runs, spread=True) for runs in zip(*results)]
+
+def robust_candidate(params: Dict, **kwargs) -> Dict:
+    return robust_population([params], **kwargs)[0]
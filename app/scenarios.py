@@ -0,0 +1,110 @@
+# Batched synthetic OHLCV scenarios: K paths per call, memoized by (n, k, seed, model, params).
+import os
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from . import telemetry
+
+OHLCV = ('open', 'high', 'low', 'close', 'volume')
+SCENARIO_CACHE_SIZE = int(os.getenv("SCENARIO_CACHE_SIZE", "64"))
+
+def _finish(rng: np.random.Generator, price: np.ndarray, wick: np.ndarray) -> Dict[str, np.ndarray]:
+    # Shared bar construction: wicks around the close, open = previous close.
+    k, n = price.shape
+    high = price + wick * rng.uniform(0, 1, (k, n))
+    low = price - wick * rng.uniform(0, 1, (k, n))
+    openp = np.roll(price, 1, axis=1); openp[:, 0] = price[:, 0]
+    vol = rng.integers(100, 200, (k, n))
+    return {"open": openp, "high": high, "low": low, "close": price, "volume": vol.astype(np.float64)}
+
+def gaussian_paths(rng, k: int, n: int, start: float = 100.0, sigma: float = 1.0):
+    """Additive Gaussian walk; for k=1 and default params this is exactly _gen_random_walk."""
+    steps = rng.normal(0, sigma, (k, n)).cumsum(axis=1)
+    return _finish(rng, start + steps, 1.0)
+
+def gbm_paths(rng, k: int, n: int, start: float = 100.0, mu: float = 0.0, sigma: float = 0.01):
+    log_ret = (mu - 0.5 * sigma ** 2) + sigma * rng.normal(0, 1, (k, n))
+    price = start * np.exp(np.cumsum(log_ret, axis=1))
+    return _finish(rng, price, price * sigma)
+
+def jump_paths(rng, k: int, n: int, start: float = 100.0, mu: float = 0.0, sigma: float = 0.01,
+               jump_rate: float = 0.01, jump_mean: float = 0.0, jump_sigma: float = 0.05):
+    """Merton jump-diffusion: GBM plus Poisson-arriving normal log-jumps."""
+    diffusion = (mu - 0.5 * sigma ** 2) + sigma * rng.normal(0, 1, (k, n))
+    jumps = rng.poisson(jump_rate, (k, n))
+    jump_size = jumps * jump_mean + np.sqrt(jumps) * jump_sigma * rng.normal(0, 1, (k, n))
+    price = start * np.exp(np.cumsum(diffusion + jump_size, axis=1))
+    return _finish(rng, price, price * sigma)
+
+def regime_paths(rng, k: int, n: int, start: float = 100.0, mu: float = 0.0,
+                 sigma_low: float = 0.005, sigma_high: float = 0.03, switch_prob: float = 0.02):
+    """GBM whose volatility follows a two-state Markov chain (calm / turbulent)."""
+    flips = rng.uniform(0, 1, (k, n)) < switch_prob
+    # regime at bar t is the parity of the number of switches so far
+    high_vol = (np.cumsum(flips, axis=1) % 2).astype(bool)
+    sigma = np.where(high_vol, sigma_high, sigma_low)
+    log_ret = (mu - 0.5 * sigma ** 2) + sigma * rng.normal(0, 1, (k, n))
+    price = start * np.exp(np.cumsum(log_ret, axis=1))
+    return _finish(rng, price, price * sigma)
+
+MODELS = {
+    "gaussian": gaussian_paths,
+    "gbm": gbm_paths,
+    "jump": jump_paths,
+    "regime": regime_paths,
+}
+
+_cache: "OrderedDict[Tuple, Dict[str, np.ndarray]]" = OrderedDict()
+stats = {"hits": 0, "misses": 0}
+telemetry.registry.collector(lambda: {f"scenario_cache_{k}": v for k, v in stats.items()})
+
+def scenario_batch(n: int, k: int = 1, seed: int = 0, model: str = "gaussian", **params) -> Dict[str, np.ndarray]:
+    """OHLCV for k paths of n bars as read-only (k x n) float64 arrays.
+
+    All paths come from one generator seeded with seed, drawn in one call per
+    field. Results are memoized (LRU, SCENARIO_CACHE_SIZE entries), so a seed
+    seen in an earlier generation costs a lookup.
+    """
+    if model not in MODELS:
+        raise ValueError(f"unknown scenario model {model!r}")
+    key = (n, k, seed, model, tuple(sorted(params.items())))
+    batch = _cache.get(key)
+    if batch is not None:
+        _cache.move_to_end(key)
+        stats["hits"] += 1
+        return batch
+    stats["misses"] += 1
+    rng = np.random.default_rng(seed)
+    batch = {}
+    for name, arr in MODELS[model](rng, k, n, **params).items():
+        arr = np.ascontiguousarray(arr, dtype=np.float64)
+        arr.setflags(write=False)
+        batch[name] = arr
+    _cache[key] = batch
+    while len(_cache) > SCENARIO_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return batch
+
+def scenario_path(batch: Dict[str, np.ndarray], j: int) -> Dict[str, np.ndarray]:
+    """Column mapping for path j (row views, no copy); run_backtest/batch_backtest accept it in place of a frame."""
+    return {name: batch[name][j] for name in OHLCV}
+
+# length of the standard scenario paths (evaluate_candidate's synthetic walk)
+BASE_BARS = 800
+
+def scenario_windows(bars: int, k: int = 1, seed: int = 0, model: str = "gaussian") -> List[Dict[str, np.ndarray]]:
+    """Column mappings for k paths of `bars` bars.
+
+    Up to BASE_BARS these are the leading windows of the standard paths, so
+    short evaluations see the start of the series a full-length one scores.
+    Longer requests draw k paths of their own length: generation is not
+    prefix-stable, so their leading bars differ from the standard paths.
+    """
+    batch = scenario_batch(max(bars, BASE_BARS), k, seed, model)
+    return [{name: col[:bars] for name, col in scenario_path(batch, j).items()} for j in range(k)]
+
+def scenario_frame(batch: Dict[str, np.ndarray], j: int) -> pd.DataFrame:
+    frame = pd.DataFrame({name: np.array(batch[name][j]) for name in OHLCV})
+    frame["volume"] = frame["volume"].astype(np.int64)
+    return frame
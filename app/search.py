@@ -0,0 +1,96 @@
+# Optuna search backend (TPE / CMA-ES) over the StrategyConfig space, persisted in the app database.
+import logging, math
+from typing import Dict, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from .config import SEARCH_BACKEND, OPTUNA_STUDY, OPTUNA_SEEDS, POPULATION
+from .db import DATABASE_URL
+from .evolution import SEARCH_BOUNDS, SEARCH_CHOICES, evaluate_candidate
+from .metrics import mean_metrics
+from .repository import get_current_config
+
+logger = logging.getLogger(__name__)
+
+# (low, high, type, log-scale); core bounds are the ones mutate clamps to
+SPACE = {
+    'atr_stop_mult': (0.5, 6.0, float, False),
+    'atr_take_mult': (0.5, 6.0, float, False),
+    'risk_per_trade': (0.001, 0.05, float, True),
+    **{k: (lo, hi, cast, False) for k, (lo, hi, cast) in SEARCH_BOUNDS.items()},
+}
+
+def _suggest(trial) -> Dict:
+    params = {}
+    for k, (lo, hi, cast, log) in SPACE.items():
+        if cast is int:
+            params[k] = trial.suggest_int(k, lo, hi)
+        else:
+            params[k] = trial.suggest_float(k, lo, hi, log=log)
+    for k, options in SEARCH_CHOICES.items():
+        params[k] = trial.suggest_categorical(k, options)
+    return params
+
+class OptunaSearch:
+    """One persistent study; each generation runs POPULATION trials.
+
+    A trial is scored on OPTUNA_SEEDS walks one seed at a time. After each seed
+    the running mean Sharpe is reported, so the median pruner can stop a clearly
+    bad trial before its remaining seeds are simulated.
+    """
+
+    def __init__(self, backend: str = SEARCH_BACKEND, study_name: str = OPTUNA_STUDY,
+                 storage_url: str = DATABASE_URL, seeds: int = OPTUNA_SEEDS):
+        import optuna
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.optuna = optuna
+        self.seeds = seeds
+        if backend == "cmaes":
+            # CMA-ES needs the `cmaes` package; parameters it cannot model fall back to random sampling
+            sampler = optuna.samplers.CmaEsSampler(warn_independent_sampling=False)
+        elif backend == "tpe":
+            sampler = optuna.samplers.TPESampler()
+        else:
+            raise ValueError(f"unknown search backend {backend!r}")
+        storage = optuna.storages.RDBStorage(url=storage_url, engine_kwargs={"pool_pre_ping": True})
+        self.study = optuna.create_study(study_name=study_name, storage=storage, direction="maximize",
+                                         sampler=sampler, pruner=optuna.pruners.MedianPruner(n_warmup_steps=1),
+                                         load_if_exists=True)
+
+    def _objective(self, trial) -> float:
+        params = _suggest(trial)
+        runs = []
+        for step in range(self.seeds):
+            runs.append(evaluate_candidate(params, seed=42 + step))
+            if runs[-1].get('aborted'):
+                # blew through the drawdown limit: rejected, like in evolve_once
+                raise self.optuna.TrialPruned()
+            sharpe = float(np.mean([r['sharpe'] for r in runs]))
+            if not math.isfinite(sharpe):
+                sharpe = -1e9
+            trial.report(sharpe, step)
+            if step < self.seeds - 1 and trial.should_prune():
+                raise self.optuna.TrialPruned()
+        metrics = mean_metrics(runs)
+        trial.set_user_attr("metrics", metrics)
+        return metrics['sharpe'] if math.isfinite(metrics['sharpe']) else -1e9
+
+    def run_generation(self, db: Session, generation: int = 0) -> Tuple[Dict, Dict]:
+        if not self.study.trials:
+            # warm start from the live config
+            cfg = get_current_config(db).dict()
+            self.study.enqueue_trial({k: cfg[k] for k in SPACE if k in cfg})
+        self.study.optimize(self._objective, n_trials=POPULATION, gc_after_trial=False)
+        if not self.study.get_trials(deepcopy=False, states=(self.optuna.trial.TrialState.COMPLETE,)):
+            # every trial so far was pruned (best_trial would raise): keep the incumbent
+            cfg = get_current_config(db).dict()
+            return cfg, mean_metrics([evaluate_candidate(cfg, seed=42 + step) for step in range(self.seeds)])
+        best = self.study.best_trial
+        return dict(best.params), dict(best.user_attrs["metrics"])
+
+_search: Optional[OptunaSearch] = None
+
+def get_search() -> OptunaSearch:
+    global _search
+    if _search is None:
+        _search = OptunaSearch()
+    return _search
@@ -0,0 +1,125 @@
+# On-disk columnar OHLCV store: one raw little-endian file per symbol and column, opened with np.memmap.
+import json, os
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+TS = 'ts'  # int64 nanoseconds since the epoch, strictly increasing
+
+class OHLCVStore:
+    """Per-symbol directory holding ts.bin, open.bin, ... and a meta.json index.
+
+    meta.json is replaced atomically after the column files are extended, and
+    readers size their memmaps from it, so a crash mid-append never exposes a
+    partial bar; the next append truncates any unindexed tail first.
+    """
+
+    def __init__(self, root: str = DATA_DIR):
+        self.root = root
+        self._maps: Dict[str, Dict[str, np.memmap]] = {}
+
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol)
+
+    def _path(self, symbol: str, column: str) -> str:
+        return os.path.join(self._dir(symbol), f"{column}.bin")
+
+    def meta(self, symbol: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._dir(symbol), "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(s for s in os.listdir(self.root) if self.meta(s) is not None)
+
+    def _write_meta(self, symbol: str, meta: dict):
+        path = os.path.join(self._dir(symbol), "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def append(self, symbol: str, frame: pd.DataFrame, ts_column: str = 'timestamp') -> int:
+        """Append bars newer than the last stored one; returns the number of rows written."""
+        ts = pd.to_datetime(frame[ts_column], utc=True).dt.as_unit('ns').astype('int64').to_numpy()
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        meta = self.meta(symbol) or {"rows": 0, "first_ts": None, "last_ts": None, "columns": [TS, *COLUMNS]}
+        keep = np.ones(len(ts), dtype=bool)
+        keep[1:] = ts[1:] != ts[:-1]
+        if meta["last_ts"] is not None:
+            keep &= ts > meta["last_ts"]
+        if not keep.any():
+            return 0
+        rows = {TS: ts[keep].astype('<i8')}
+        for column in COLUMNS:
+            rows[column] = frame[column].to_numpy(dtype=np.float64)[order][keep].astype('<f8')
+        os.makedirs(self._dir(symbol), exist_ok=True)
+        for column, values in rows.items():
+            path = self._path(symbol, column)
+            with open(path, "ab") as f:
+                f.truncate(meta["rows"] * values.itemsize)
+                f.seek(0, os.SEEK_END)
+                values.tofile(f)
+        added = int(keep.sum())
+        if meta["first_ts"] is None:
+            meta["first_ts"] = int(rows[TS][0])
+        meta["last_ts"] = int(rows[TS][-1])
+        meta["rows"] += added
+        self._write_meta(symbol, meta)
+        self._maps.pop(symbol, None)
+        return added
+
+    def open(self, symbol: str) -> Dict[str, np.ndarray]:
+        """Read-only memmaps of every column, sized by the indexed row count."""
+        maps = self._maps.get(symbol)
+        meta = self.meta(symbol)
+        if meta is None:
+            raise KeyError(f"no data for symbol {symbol!r}")
+        if maps is None or len(maps[TS]) != meta["rows"]:
+            maps = {}
+            for column in meta["columns"]:
+                dtype = '<i8' if column == TS else '<f8'
+                if meta["rows"] == 0:
+                    maps[column] = np.empty(0, dtype=dtype)
+                else:
+                    maps[column] = np.memmap(self._path(symbol, column), dtype=dtype, mode='r', shape=(meta["rows"],))
+            self._maps[symbol] = maps
+        return maps
+
+    def slice(self, symbol: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Columns for start <= ts < end as memmap views (no copy).
+
+        start/end take anything pd.Timestamp accepts, or int nanoseconds. The
+        result is a column mapping that run_backtest, batch_backtest,
+        enhanced_backtest_strategy and evaluate_candidate accept in place of a frame.
+        """
+        maps = self.open(symbol)
+        ts = maps[TS]
+        lo = 0 if start is None else int(np.searchsorted(ts, _to_ns(start), side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, _to_ns(end), side='left'))
+        return {column: values[lo:hi] for column, values in maps.items()}
+
+def _to_ns(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.value)
+
+def import_csv(store: OHLCVStore, symbol: str, path: str, ts_column: str = 'timestamp', chunksize: int = 1_000_000) -> int:
+    """Append a CSV of bars in chunks; rows already in the store are skipped."""
+    added = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        added += store.append(symbol, chunk, ts_column=ts_column)
+    return added
+
+def import_parquet(store: OHLCVStore, symbol: str, path: str, ts_column: str = 'timestamp') -> int:
+    # pandas needs pyarrow (or fastparquet) for this; it raises ImportError otherwise
+    return store.append(symbol, pd.read_parquet(path), ts_column=ts_column)
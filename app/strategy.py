@@ -1,9 +1,13 @@
 # Strategy module implementing enhanced logic and backtest for accurate evaluation.
-import logging, traceback
+import logging, math, traceback
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Mapping, Tuple, Union
 import numpy as np
 import pandas as pd
+from . import telemetry
+from .indicators import DEFAULT_SPECS, indicator_arrays
+from .ledger import OPEN, STOP, TAKE, TradeLedger
+from .timeframes import higher_tf_close
 
 logger = logging.getLogger(__name__)
 
@@ -16,61 +20,89 @@ class Position:
     take_price: Optional[float]
     direction: int
 
-def ensure_indicators(df: pd.DataFrame) -> pd.DataFrame:
+DEFAULT_STRATEGY_CONFIG: Dict[str, Any] = {
+    'ema_fast': 'ema21',
+    'ema_slow': 'ema50',
+    'rsi_column': 'rsi',
+    'rsi_low': 30,
+    'rsi_high': 70,
+    'min_vol_mult': 1.1,
+    'atr_stop_mult': 1.5,
+    'atr_take_mult': 3.0,
+    'trend_weight': 0.4,
+    'rsi_weight': 0.15,
+    'vol_weight': 0.15,
+    'candle_weight': 0.2,
+    'min_confidence': 0.5,
+    # >0: backtests feed the close of the last completed bar of this many base bars as higher_tf_close
+    'htf_factor': 0,
+}
+
+def indicator_column(kind: str, value) -> str:
+    # Strategy config may name a column ('ema21') or give a span (21 -> 'ema21').
+    return value if isinstance(value, str) else f"{kind}{int(value)}"
+
+def config_spans(cfg: Dict[str, Any]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """EMA and RSI spans a strategy config asks for by number rather than by column."""
+    ema_spans = tuple(int(cfg[k]) for k in ('ema_fast', 'ema_slow') if not isinstance(cfg.get(k, ''), str))
+    rsi_spans = tuple(int(cfg[k]) for k in ('rsi_column',) if not isinstance(cfg.get(k, ''), str))
+    return ema_spans, rsi_spans
+
+def params_config(params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Strategy config overrides for an evolver/model params dict (StrategyConfig field names)."""
+    cfg = {k: params[k] for k in ('atr_stop_mult', 'atr_take_mult', 'rsi_low', 'rsi_high') if k in params}
+    for k in ('ema_fast', 'ema_slow'):
+        if k in params:
+            cfg[k] = int(params[k])
+    if 'confidence_threshold' in params:
+        cfg['min_confidence'] = params['confidence_threshold']
+    if params.get('htf_factor'):
+        cfg['htf_factor'] = int(params['htf_factor'])
+    return cfg
+
+def ensure_indicators(df: pd.DataFrame, ema_spans=(), rsi_spans=()) -> pd.DataFrame:
     df = df.copy()
-    if 'ema21' not in df.columns:
-        df['ema21'] = df['close'].ewm(span=21, adjust=False).mean()
-    if 'ema50' not in df.columns:
-        df['ema50'] = df['close'].ewm(span=50, adjust=False).mean()
-    if 'atr' not in df.columns:
-        high_low = df['high'] - df['low']
-        high_close = (df['high'] - df['close'].shift()).abs()
-        low_close = (df['low'] - df['close'].shift()).abs()
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        df['atr'] = tr.rolling(14, min_periods=1).mean()
-    if 'rsi' not in df.columns:
-        delta = df['close'].diff()
-        up = delta.clip(lower=0)
-        down = -1 * delta.clip(upper=0)
-        ma_up = up.ewm(span=14, adjust=False).mean()
-        ma_down = down.ewm(span=14, adjust=False).mean()
-        rs = ma_up / (ma_down + 1e-9)
-        df['rsi'] = 100 - (100 / (1 + rs))
-    if 'vol_avg' not in df.columns:
-        df['vol_avg'] = df['volume'].rolling(20, min_periods=1).mean()
+    cols = indicator_arrays(df, ema_spans=ema_spans, rsi_spans=rsi_spans)
+    columns = [c for c, _, _ in DEFAULT_SPECS] + [f"ema{s}" for s in ema_spans] + [f"rsi{s}" for s in rsi_spans]
+    for column in columns:
+        if column not in df.columns:
+            df[column] = cols[column].copy()
     return df
 
+def _logic_error(e: Exception) -> Tuple[int, Dict[str, float]]:
+    logger.error("Strategy logic error: %s", e)
+    logger.debug(traceback.format_exc())
+    return 0, {'confidence': 0.0, 'stop_atr_mult': 1.5, 'take_atr_mult': 3.0}
+
 def enhanced_strategy_logic(df: pd.DataFrame,
                             i: int,
                             higher_tf_close: Optional[float] = None,
                             config: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, float]]:
     try:
-        cfg = {
-            'ema_fast': 'ema21',
-            'ema_slow': 'ema50',
-            'rsi_low': 30,
-            'rsi_high': 70,
-            'min_vol_mult': 1.1,
-            'atr_stop_mult': 1.5,
-            'atr_take_mult': 3.0,
-            'trend_weight': 0.4,
-            'rsi_weight': 0.15,
-            'vol_weight': 0.15,
-            'candle_weight': 0.2,
-            'min_confidence': 0.5,
-        }
-        if config:
-            cfg.update(config)
-
         row = df.iloc[i]
         prev = df.iloc[i-1]
+    except Exception as e:
+        return _logic_error(e)
+    return strategy_decision(row, prev, higher_tf_close=higher_tf_close, config=config)
+
+def strategy_decision(row: Mapping[str, float],
+                      prev: Mapping[str, float],
+                      higher_tf_close: Optional[float] = None,
+                      config: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, float]]:
+    # Body of enhanced_strategy_logic for one bar and its predecessor; row/prev may
+    # be pandas rows or plain dicts (e.g. StreamingIndicators bars).
+    try:
+        cfg = dict(DEFAULT_STRATEGY_CONFIG)
+        if config:
+            cfg.update(config)
 
         signal = 0
         confidence = 0.0
 
         # Trend filter
-        ema_fast = row[cfg['ema_fast']]
-        ema_slow = row[cfg['ema_slow']]
+        ema_fast = row[indicator_column('ema', cfg['ema_fast'])]
+        ema_slow = row[indicator_column('ema', cfg['ema_slow'])]
+        rsi = row[indicator_column('rsi', cfg['rsi_column'])]
         trend_long = row['close'] > ema_fast > ema_slow
         trend_short = row['close'] < ema_fast < ema_slow
         if trend_long:
@@ -79,9 +111,9 @@ def enhanced_strategy_logic(df: pd.DataFrame,
             confidence += cfg['trend_weight']
 
         # RSI
-        if row['rsi'] < cfg['rsi_low']:
+        if rsi < cfg['rsi_low']:
             confidence += cfg['rsi_weight']
-        if row['rsi'] > cfg['rsi_high']:
+        if rsi > cfg['rsi_high']:
             confidence += cfg['rsi_weight']
 
         # Volume spike
@@ -102,9 +134,9 @@ def enhanced_strategy_logic(df: pd.DataFrame,
             if row['close'] > higher_tf_close:
                 confidence += 0.05
 
-        if is_bull_engulf and (row['rsi'] < cfg['rsi_high']) and trend_long:
+        if is_bull_engulf and (rsi < cfg['rsi_high']) and trend_long:
             signal = 1
-        elif is_bear_engulf and (row['rsi'] > cfg['rsi_low']) and trend_short:
+        elif is_bear_engulf and (rsi > cfg['rsi_low']) and trend_short:
             signal = -1
         else:
             if (row['close'] > prev['high']) and (row['volume'] > row['vol_avg']):
@@ -123,9 +155,74 @@ def enhanced_strategy_logic(df: pd.DataFrame,
 
         return signal, {'confidence': confidence, 'stop_atr_mult': stop_atr_mult, 'take_atr_mult': take_atr_mult}
     except Exception as e:
-        logger.error("Strategy logic error: %s", e)
-        logger.debug(traceback.format_exc())
-        return 0, {'confidence': 0.0, 'stop_atr_mult': 1.5, 'take_atr_mult': 3.0}
+        return _logic_error(e)
+
+def _col(data: Union[pd.DataFrame, Mapping[str, np.ndarray]], name: str) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(data[name], dtype=np.float64))
+
+def raw_signal_arrays(df: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+                      higher_tf_close=None,
+                      config: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Whole-series version of enhanced_strategy_logic before the min_confidence cut.
+
+    Bar i is compared against bar i-1 (bar 0 wraps to the last bar, exactly like
+    df.iloc[i-1] does in the per-bar function). higher_tf_close may be a scalar
+    or an array aligned with df; NaN entries behave like None. df may also be a
+    mapping of column arrays such as indicator_arrays returns.
+    """
+    cfg = dict(DEFAULT_STRATEGY_CONFIG)
+    if config:
+        cfg.update(config)
+    o, h, l, c = _col(df, 'open'), _col(df, 'high'), _col(df, 'low'), _col(df, 'close')
+    v, va = _col(df, 'volume'), _col(df, 'vol_avg')
+    rsi = _col(df, indicator_column('rsi', cfg['rsi_column']))
+    ema_fast = _col(df, indicator_column('ema', cfg['ema_fast']))
+    ema_slow = _col(df, indicator_column('ema', cfg['ema_slow']))
+    po, ph, pl, pc = np.roll(o, 1), np.roll(h, 1), np.roll(l, 1), np.roll(c, 1)
+
+    # Additions are applied in the same order as the per-bar function so the
+    # float sums are bit-identical (x + 0.0 == x).
+    confidence = np.zeros(len(c))
+    trend_long = (c > ema_fast) & (ema_fast > ema_slow)
+    trend_short = (c < ema_fast) & (ema_fast < ema_slow)
+    confidence += np.where(trend_long, cfg['trend_weight'], 0.0)
+    confidence += np.where(trend_short, cfg['trend_weight'], 0.0)
+    confidence += np.where(rsi < cfg['rsi_low'], cfg['rsi_weight'], 0.0)
+    confidence += np.where(rsi > cfg['rsi_high'], cfg['rsi_weight'], 0.0)
+    confidence += np.where(v > cfg['min_vol_mult'] * va, cfg['vol_weight'], 0.0)
+
+    body = np.abs(c - o)
+    prev_body = np.abs(pc - po)
+    bull_engulf = (c > o) & (o < pc) & (c > po) & (body > prev_body)
+    bear_engulf = (c < o) & (o > pc) & (c < po) & (body > prev_body)
+    confidence += np.where(bull_engulf, cfg['candle_weight'], 0.0)
+    confidence += np.where(bear_engulf, cfg['candle_weight'], 0.0)
+
+    if higher_tf_close is not None:
+        confidence += np.where(c > np.asarray(higher_tf_close, dtype=np.float64), 0.05, 0.0)
+
+    pattern_long = bull_engulf & (rsi < cfg['rsi_high']) & trend_long
+    pattern_short = ~pattern_long & bear_engulf & (rsi > cfg['rsi_low']) & trend_short
+    no_pattern = ~(pattern_long | pattern_short)
+    breakout_long = no_pattern & (c > ph) & (v > va)
+    breakout_short = no_pattern & (c < pl) & (v > va)
+    confidence += np.where(breakout_long, 0.05, 0.0)
+    confidence += np.where(breakout_short, 0.05, 0.0)
+
+    signal = np.zeros(len(c), dtype=np.int8)
+    signal[pattern_long | breakout_long] = 1
+    signal[pattern_short | breakout_short] = -1
+    np.minimum(confidence, 1.0, out=confidence)
+    return signal, confidence
+
+def signal_arrays(df: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+                  higher_tf_close=None,
+                  config: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Signal and confidence for every bar, identical to calling enhanced_strategy_logic per bar."""
+    signal, confidence = raw_signal_arrays(df, higher_tf_close=higher_tf_close, config=config)
+    min_confidence = (config or {}).get('min_confidence', DEFAULT_STRATEGY_CONFIG['min_confidence'])
+    signal[confidence < min_confidence] = 0
+    return signal, confidence
 
 def dynamic_position_sizing(account_balance: float,
                              atr: float,
@@ -138,13 +235,215 @@ def dynamic_position_sizing(account_balance: float,
     size = risk_amount / (stop_distance * tick_value)
     return float(size)
 
+@dataclass
+class BacktestResult:
+    equity: np.ndarray
+    position: np.ndarray
+    unrealized_pnl: np.ndarray
+    start: int = 1
+    # set when the run stopped early on the drawdown limit; arrays end at that bar
+    aborted: bool = False
+    # TRADE_DTYPE rows when the run was given a ledger
+    trades: Optional[np.ndarray] = None
+
+    @property
+    def index(self) -> pd.RangeIndex:
+        return pd.RangeIndex(self.start, self.start + len(self.equity))
+
+    @property
+    def balance(self) -> pd.Series:
+        return pd.Series(self.equity, index=self.index, name='balance')
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'balance': self.equity,
+            'position': self.position,
+            'unrealized_pnl': self.unrealized_pnl
+        }, index=self.index)
+
+def backtest_arrays(high: np.ndarray,
+                    low: np.ndarray,
+                    close: np.ndarray,
+                    atr: np.ndarray,
+                    signal: np.ndarray,
+                    initial_balance: float = 10000.0,
+                    risk_per_trade: float = 0.01,
+                    slippage: float = 0.0005,
+                    commission: float = 0.0002,
+                    spread: float = 0.0,
+                    atr_stop_mult: float = 1.5,
+                    atr_take_mult: float = 3.0,
+                    max_drawdown: Optional[float] = None,
+                    ledger: Optional[TradeLedger] = None) -> BacktestResult:
+    """Position loop of enhanced_backtest_strategy over plain arrays.
+
+    Bars 1..n-1 are simulated (bar 0 only seeds the indicators), so the outputs
+    have n-1 entries. Stop/take/slippage/commission handling is the same as the
+    per-bar reference, including the short-side cash accounting.
+
+    With max_drawdown (e.g. -0.35) the run stops on the first bar where
+    equity / running peak - 1 falls below it, the same drawdown measure
+    compute_metrics uses, and returns the truncated result with aborted=True.
+
+    With a ledger every closed trade is recorded into it (bar indices into the
+    inputs), plus a position still open at the last bar as reason OPEN marked
+    at that bar's close; result.trades is then ledger.trades. Ledger pnl is the
+    trade's own (exit - entry) * size * direction less both fees, not the cash
+    change the short-side accounting above books.
+    """
+    n = len(close)
+    m = max(n - 1, 0)
+    equity = np.empty(m, dtype=np.float64)
+    position = np.zeros(m, dtype=np.int64)
+    unrealized = np.zeros(m, dtype=np.float64)
+    # Python floats are much cheaper to index than numpy scalars inside the loop.
+    h, l, c, a, s = high.tolist(), low.tolist(), close.tolist(), atr.tolist(), signal.tolist()
+
+    balance = initial_balance
+    cash = balance
+    direction = 0
+    entry_price = size = stop_price = take_price = 0.0
+    entry_index, entry_fee = 0, 0.0
+    peak = -math.inf
+    for i in range(1, n):
+        if direction == 1:
+            if l[i] <= stop_price:
+                exit_price = stop_price * (1 + slippage)
+                fee = abs(exit_price * size) * commission
+                cash += size * exit_price - fee
+                balance = cash
+                direction = 0
+                if ledger is not None:
+                    ledger.record(entry_index, i, 1, STOP, entry_price, exit_price, size, entry_fee, fee)
+            elif h[i] >= (take_price or 1e18):
+                exit_price = (take_price or c[i]) * (1 - slippage)
+                fee = abs(exit_price * size) * commission
+                cash += size * exit_price - fee
+                balance = cash
+                direction = 0
+                if ledger is not None:
+                    ledger.record(entry_index, i, 1, TAKE, entry_price, exit_price, size, entry_fee, fee)
+        elif direction == -1:
+            if h[i] >= stop_price:
+                exit_price = stop_price * (1 - slippage)
+                pnl = (entry_price - exit_price) * size
+                fee = abs(exit_price * size) * commission
+                cash += size * (entry_price + pnl) - fee
+                balance = cash
+                direction = 0
+                if ledger is not None:
+                    ledger.record(entry_index, i, -1, STOP, entry_price, exit_price, size, entry_fee, fee)
+            elif l[i] <= (take_price or -1e18):
+                exit_price = (take_price or c[i]) * (1 + slippage)
+                pnl = (entry_price - exit_price) * size
+                fee = abs(exit_price * size) * commission
+                cash += size * (entry_price + pnl) - fee
+                balance = cash
+                direction = 0
+                if ledger is not None:
+                    ledger.record(entry_index, i, -1, TAKE, entry_price, exit_price, size, entry_fee, fee)
+
+        sig = s[i]
+        if direction == 0 and sig != 0:
+            close_i, atr_i = c[i], a[i]
+            new_size = dynamic_position_sizing(balance, atr_i, risk_per_trade=risk_per_trade, price=close_i, atr_stop_mult=atr_stop_mult)
+            if new_size <= 0:
+                new_size = 0.0
+            if sig == 1:
+                new_stop = close_i - atr_stop_mult * atr_i - spread / 2
+                new_take = close_i + atr_take_mult * atr_i
+                new_entry = close_i * (1 + slippage + spread / 2)
+            else:
+                new_stop = close_i + atr_stop_mult * atr_i + spread / 2
+                new_take = close_i - atr_take_mult * atr_i
+                new_entry = close_i * (1 - slippage - spread / 2)
+            notional = new_entry * new_size
+            fee = notional * commission
+            if notional + fee <= cash:
+                cash -= notional + fee
+                direction = 1 if sig == 1 else -1
+                entry_price, size, stop_price, take_price = new_entry, new_size, new_stop, new_take
+                entry_index, entry_fee = i, fee
+
+        unreal = 0.0
+        if direction == 1:
+            unreal = (c[i] - entry_price) * size
+        elif direction == -1:
+            unreal = (entry_price - c[i]) * size
+        eq = cash + unreal
+        equity[i - 1] = eq
+        if direction != 0:
+            position[i - 1] = 1
+            unrealized[i - 1] = unreal
+        if max_drawdown is not None:
+            if eq > peak:
+                peak = eq
+            if eq / peak - 1 < max_drawdown:
+                return BacktestResult(equity=equity[:i], position=position[:i], unrealized_pnl=unrealized[:i], aborted=True,
+                                      trades=_close_ledger(ledger, direction, entry_index, i, entry_price, c[i], size, entry_fee))
+    return BacktestResult(equity=equity, position=position, unrealized_pnl=unrealized,
+                          trades=_close_ledger(ledger, direction, entry_index, n - 1, entry_price, c[n - 1] if n else 0.0, size, entry_fee))
+
+def _close_ledger(ledger, direction, entry_index, last, entry_price, close, size, entry_fee):
+    # the position still held at the end, marked at the close without an exit fee
+    if ledger is None:
+        return None
+    if direction != 0:
+        ledger.record(entry_index, last, direction, OPEN, entry_price, close, size, entry_fee, 0.0)
+    return ledger.trades
+
+def run_backtest(df, initial_balance: float = 10000.0,
+                 risk_per_trade: float = 0.01,
+                 slippage: float = 0.0005,
+                 commission: float = 0.0002,
+                 spread: float = 0.0,
+                 config: Optional[Dict[str, Any]] = None,
+                 max_drawdown: Optional[float] = None,
+                 trades: bool = False) -> BacktestResult:
+    cfg = dict(DEFAULT_STRATEGY_CONFIG)
+    if config:
+        cfg.update(config)
+    ema_spans, rsi_spans = config_spans(cfg)
+    with telemetry.stage("indicators", engine="single"):
+        cols = indicator_arrays(df, ema_spans=ema_spans, rsi_spans=rsi_spans)
+    with telemetry.stage("signals", engine="single"):
+        htf = higher_tf_close(cols, factor=cfg['htf_factor']) if cfg['htf_factor'] else None
+        signal, _ = signal_arrays(cols, higher_tf_close=htf, config=config)
+    with telemetry.stage("position_loop", engine="single"):
+        out = backtest_arrays(cols['high'], cols['low'], cols['close'], cols['atr'], signal,
+                              initial_balance=initial_balance, risk_per_trade=risk_per_trade,
+                              slippage=slippage, commission=commission, spread=spread,
+                              atr_stop_mult=cfg['atr_stop_mult'], atr_take_mult=cfg['atr_take_mult'],
+                              max_drawdown=max_drawdown, ledger=TradeLedger() if trades else None)
+    telemetry.inc("bars_simulated_total", len(out.equity))
+    return out
+
 def enhanced_backtest_strategy(df, initial_balance: float = 10000.0,
                                risk_per_trade: float = 0.01,
                                slippage: float = 0.0005,
                                commission: float = 0.0002,
-                               spread: float = 0.0):
+                               spread: float = 0.0,
+                               config: Optional[Dict[str, Any]] = None,
+                               vectorized: bool = True):
+    kwargs = dict(initial_balance=initial_balance, risk_per_trade=risk_per_trade, slippage=slippage,
+                  commission=commission, spread=spread, config=config)
+    if not vectorized:
+        return _backtest_per_bar(df, **kwargs)
+    return run_backtest(df, **kwargs).frame()
+
+def _backtest_per_bar(df, initial_balance: float = 10000.0,
+                      risk_per_trade: float = 0.01,
+                      slippage: float = 0.0005,
+                      commission: float = 0.0002,
+                      spread: float = 0.0,
+                      config: Optional[Dict[str, Any]] = None):
+    # Reference implementation: one enhanced_strategy_logic call and one pandas row per bar.
+    cfg = dict(DEFAULT_STRATEGY_CONFIG)
+    if config:
+        cfg.update(config)
     df = df.copy().reset_index(drop=True)
-    df = ensure_indicators(df)
+    df = ensure_indicators(df, *config_spans(cfg))
+    htf = higher_tf_close(df, factor=cfg['htf_factor']).tolist() if cfg['htf_factor'] else None
     balance = initial_balance
     position = None
     cash = balance
@@ -154,7 +453,8 @@ def enhanced_backtest_strategy(df, initial_balance: float = 10000.0,
 
     for i in range(1, len(df)):
         row = df.iloc[i]
-        signal, meta = enhanced_strategy_logic(df, i)
+        htf_i = htf[i] if htf is not None and htf[i] == htf[i] else None
+        signal, meta = enhanced_strategy_logic(df, i, higher_tf_close=htf_i, config=config)
         # check existing position for stop/take using bar extremes
         if position is not None:
             if position.direction == 1:
@@ -222,7 +522,6 @@ def enhanced_backtest_strategy(df, initial_balance: float = 10000.0,
         position_list.append(1 if position is not None else 0)
         unreal_list.append(unreal)
 
-    import pandas as pd
     out = pd.DataFrame({
         'balance': equity_list,
         'position': position_list,
@@ -0,0 +1,113 @@
+# Incremental indicator state: one bar in, constant time and memory per update.
+import math
+from collections import deque
+from typing import Any, Dict, Optional
+
+NAN = float('nan')
+
+class _EWM:
+    """One step of pandas ewm(span, adjust=False).mean(), NaN handling included."""
+    __slots__ = ('alpha', 'weighted', 'old_wt')
+
+    def __init__(self, span: int):
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self.weighted = None  # None until the first bar, NaN until the first observation
+        self.old_wt = 1.0
+
+    def update(self, x: float) -> float:
+        if self.weighted is None:
+            self.weighted = x
+        elif self.weighted == self.weighted:
+            self.old_wt *= 1.0 - self.alpha
+            if x == x:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * x) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif x == x:
+            self.weighted = x
+        return self.weighted
+
+class _RollingMean:
+    """rolling(window, min_periods=1).mean() over the last `window` values."""
+    __slots__ = ('values',)
+
+    def __init__(self, window: int):
+        self.values = deque(maxlen=window)
+
+    def update(self, x: float) -> float:
+        self.values.append(x)
+        valid = [v for v in self.values if v == v]
+        return math.fsum(valid) / len(valid) if valid else NAN
+
+class StreamingIndicators:
+    """EMA fast/slow, ATR, RSI and volume average updated one bar at a time.
+
+    Matches ensure_indicators on the same bar sequence: the EMAs and RSI follow
+    the pandas ewm(adjust=False) recurrence exactly; ATR and vol_avg are the same
+    simple rolling means (ensure_indicators' ATR is a 14-bar mean of the true
+    range, not Wilder smoothing) and agree to floating-point rounding.
+    """
+
+    def __init__(self, ema_fast: int = 21, ema_slow: int = 50, atr_window: int = 14,
+                 rsi_span: int = 14, vol_window: int = 20):
+        self.params = {'ema_fast': ema_fast, 'ema_slow': ema_slow, 'atr_window': atr_window,
+                       'rsi_span': rsi_span, 'vol_window': vol_window}
+        self._ema_fast = _EWM(ema_fast)
+        self._ema_slow = _EWM(ema_slow)
+        self._rsi_up = _EWM(rsi_span)
+        self._rsi_down = _EWM(rsi_span)
+        self._tr = _RollingMean(atr_window)
+        self._vol = _RollingMean(vol_window)
+        self.count = 0
+        self.prev: Optional[Dict[str, float]] = None
+        self.last: Optional[Dict[str, float]] = None
+
+    def update(self, open: float, high: float, low: float, close: float, volume: float) -> Dict[str, float]:
+        """Ingest one bar; returns the bar merged with its indicator values."""
+        open, high, low, close, volume = float(open), float(high), float(low), float(close), float(volume)
+        prev_close = self.last['close'] if self.last is not None else NAN
+        # max over the non-NaN parts, like concat(...).max(axis=1)
+        ranges = [r for r in (high - low, abs(high - prev_close), abs(low - prev_close)) if r == r]
+        tr = max(ranges) if ranges else NAN
+        delta = close - prev_close
+        up = max(delta, 0.0) if delta == delta else NAN
+        down = -1 * min(delta, 0.0) if delta == delta else NAN
+        ma_up, ma_down = self._rsi_up.update(up), self._rsi_down.update(down)
+        rs = ma_up / (ma_down + 1e-9)
+        bar = {
+            'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume,
+            f"ema{self.params['ema_fast']}": self._ema_fast.update(close),
+            f"ema{self.params['ema_slow']}": self._ema_slow.update(close),
+            'atr': self._tr.update(tr),
+            'rsi': 100 - (100 / (1 + rs)),
+            'vol_avg': self._vol.update(volume),
+        }
+        self.prev, self.last = self.last, bar
+        self.count += 1
+        return bar
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain, JSON-serialisable copy of the full state."""
+        ewm = lambda e: [e.weighted, e.old_wt]
+        return {
+            'params': dict(self.params),
+            'ema_fast': ewm(self._ema_fast), 'ema_slow': ewm(self._ema_slow),
+            'rsi_up': ewm(self._rsi_up), 'rsi_down': ewm(self._rsi_down),
+            'tr': list(self._tr.values), 'vol': list(self._vol.values),
+            'count': self.count,
+            'prev': dict(self.prev) if self.prev else None,
+            'last': dict(self.last) if self.last else None,
+        }
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "StreamingIndicators":
+        obj = cls(**state['params'])
+        for name in ('ema_fast', 'ema_slow', 'rsi_up', 'rsi_down'):
+            e = getattr(obj, '_' + name)
+            e.weighted, e.old_wt = state[name]
+        obj._tr.values.extend(state['tr'])
+        obj._vol.values.extend(state['vol'])
+        obj.count = state['count']
+        obj.prev = dict(state['prev']) if state['prev'] else None
+        obj.last = dict(state['last']) if state['last'] else None
+        return obj
@@ -0,0 +1,156 @@
+# Stage timers and counters rendered in the Prometheus text format; no-ops when TELEMETRY=0.
+import os, threading, time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+TELEMETRY = os.getenv("TELEMETRY", "1") == "1"
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+PREFIX = "trading_organism_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# HELP text per metric, rendered once per family
+HELP = {
+    "stage_seconds": "Wall time per pipeline stage",
+    "http_request_seconds": "API request latency by route",
+    "bars_simulated_total": "Candidate-bars stepped by the position loops",
+    "candidates_evaluated_total": "Candidate evaluations (one per scenario path)",
+    "generations_total": "Generations run by the worker",
+    "promotions_total": "Models promoted",
+    "worker_errors_total": "Worker and evaluator loop iterations that raised",
+    "queue_jobs_completed_total": "Evaluation jobs completed by this process",
+    "queue_jobs_failed_total": "Evaluation job attempts that raised",
+}
+
+class Registry:
+    """Counters and stage histograms, plus callbacks sampled at render time.
+
+    Values live in this process only: evaluations run in the EVAL_WORKERS
+    process pool are not counted.
+    """
+
+    def __init__(self, enabled: bool = TELEMETRY):
+        self.enabled = enabled
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._hist: Dict[Tuple[str, Labels], List[float]] = {}  # bucket counts..., count, sum
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = [0.0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += seconds
+
+    @contextmanager
+    def _timer(self, name: str, labels: dict):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def stage(self, stage: str, **labels):
+        """Context manager timing one pipeline stage into stage_seconds{stage=...}."""
+        if not self.enabled:
+            return _NULL
+        return self._timer("stage_seconds", {"stage": stage, **labels})
+
+    def collector(self, fn: Callable[[], Dict[str, float]]):
+        """fn() -> {metric name: value}, read on every render (for stats kept elsewhere)."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            hist = {k: list(v) for k, v in self._hist.items()}
+        for name in sorted({n for n, _ in counters}):
+            full = PREFIX + name
+            if name in HELP:
+                lines.append(f"# HELP {full} {HELP[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{full}{_fmt_labels(labels)} {_num(value)}")
+        for name in sorted({n for n, _ in hist}):
+            full = PREFIX + name
+            if name in HELP:
+                lines.append(f"# HELP {full} {HELP[name]}")
+            lines.append(f"# TYPE {full} histogram")
+            for (n, labels), h in sorted(hist.items()):
+                if n != name:
+                    continue
+                for bound, count in zip(BUCKETS, h):
+                    lines.append(f"{full}_bucket{_fmt_labels(labels + (('le', f'{bound:g}'),))} {_num(count)}")
+                lines.append(f"{full}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {_num(h[-2])}")
+                lines.append(f"{full}_count{_fmt_labels(labels)} {_num(h[-2])}")
+                lines.append(f"{full}_sum{_fmt_labels(labels)} {h[-1]:.6f}")
+        for fn in self._collectors:
+            for name, value in sorted(fn().items()):
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                lines.append(f"{PREFIX}{name} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullTimer()
+
+def _num(value: float) -> str:
+    # exact integers for counts, full precision otherwise
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+registry = Registry()
+stage = registry.stage
+inc = registry.inc
+
+def serve(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Expose registry.render() on http://host:port/metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
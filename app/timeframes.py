@@ -0,0 +1,65 @@
+# Higher-timeframe bars built once per series, plus a lookahead-free map from base bars to them.
+import hashlib
+from typing import Dict, Optional, Tuple
+import numpy as np
+from .indicators import fingerprint, indicator_cache, ohlcv_arrays
+
+def resample(cols: Dict[str, np.ndarray], factor: int) -> Dict[str, np.ndarray]:
+    """Every `factor` consecutive base bars as one higher bar; the last one may be partial.
+
+    'end' holds the base index each higher bar closes on.
+    """
+    n = len(cols['close'])
+    starts = np.arange(0, n, factor)
+    end = np.minimum(starts + factor, n) - 1
+    return {
+        'open': cols['open'][starts],
+        'high': np.maximum.reduceat(cols['high'], starts),
+        'low': np.minimum.reduceat(cols['low'], starts),
+        'close': cols['close'][end],
+        'volume': np.add.reduceat(cols['volume'], starts),
+        'end': end,
+    }
+
+def htf_index(n: int, factor: int) -> np.ndarray:
+    """For base bar i, the newest higher bar whose last base bar is <= i (-1 before the first completes)."""
+    return (np.arange(n) + 1) // factor - 1
+
+def time_buckets(ts: np.ndarray, interval: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(map, starts) for grouping int timestamps (e.g. ns) into interval buckets.
+
+    starts is the first base bar of every bucket. Only the bucket before a bar's
+    own one is known to be complete, so map[i] is bucket(i) - 1: a bucket is
+    used once a later bar has started.
+    """
+    new = np.r_[True, np.diff(np.asarray(ts, dtype=np.int64) // interval) != 0]
+    return np.cumsum(new) - 2, np.flatnonzero(new)
+
+def higher_tf_close(data, factor: Optional[int] = None, interval: Optional[int] = None,
+                    ts_column: str = 'ts') -> np.ndarray:
+    """Close of the latest completed higher-timeframe bar for every base bar, NaN before there is one.
+
+    Either `factor` base bars per higher bar, or an `interval` over data[ts_column]
+    (e.g. 4h in ns for an OHLCVStore slice). The result is cached with the
+    indicators, so backtests and signal passes on the same series read it as an
+    array lookup; NaN entries behave like higher_tf_close=None.
+    """
+    cols = ohlcv_arrays(data)
+    n = len(cols['close'])
+    if factor:
+        key = (fingerprint(cols), 'htf_close', int(factor))
+        def compute():
+            idx = htf_index(n, int(factor))
+            close = resample(cols, int(factor))['close']
+            return np.where(idx >= 0, close[np.maximum(idx, 0)], np.nan)
+    elif interval:
+        ts = np.ascontiguousarray(np.asarray(data[ts_column], dtype=np.int64))
+        key = (fingerprint(cols), 'htf_close_ts', int(interval), hashlib.blake2b(ts.data, digest_size=16).hexdigest())
+        def compute():
+            idx, starts = time_buckets(ts, int(interval))
+            # a bucket's close is the close of the bar before the next bucket starts
+            last = np.r_[starts[1:] - 1, n - 1]
+            return np.where(idx >= 0, cols['close'][last[np.maximum(idx, 0)]], np.nan)
+    else:
+        raise ValueError("higher_tf_close needs factor or interval")
+    return indicator_cache.get_or_compute(key, compute)
@@ -0,0 +1,167 @@
+# Benchmarks for the evaluation and API hot paths.
+#   python bench.py run [--quick] [--out results.json]
+#   python bench.py compare base.json new.json [--threshold 0.1]   (exit 1 on regression)
+import argparse, json, os, platform, statistics, subprocess, sys, tempfile, time
+
+# isolated database and no side effects; must be set before anything imports app.db / app.config
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+os.environ["WEBHOOK_URL"] = ""
+os.environ["FITNESS_CACHE"] = "0"
+
+def _best(fn, repeat: int) -> float:
+    # best-of-N wall time: the least noisy estimate on a shared machine
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def _result(value: float, unit: str, higher_is_better: bool, **extra) -> dict:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+def bench_backtest(quick: bool) -> dict:
+    from app.backtest import _gen_random_walk
+    from app.indicators import indicator_cache
+    from app.strategy import enhanced_backtest_strategy
+    out = {}
+    for n in ((500, 2000) if quick else (500, 2000, 10000)):
+        df = _gen_random_walk(n=n, seed=1)
+        def run():
+            indicator_cache.clear()
+            enhanced_backtest_strategy(df)
+        out[f"backtest.bars_per_sec.n{n}"] = _result(n / _best(run, 3 if quick else 5), "bars/s", True)
+    return out
+
+def bench_indicators_metrics(quick: bool) -> dict:
+    import numpy as np
+    import pandas as pd
+    from app.backtest import _gen_random_walk
+    from app.indicators import indicator_cache
+    from app.metrics import batch_metrics, compute_metrics
+    from app.strategy import ensure_indicators
+    n = 2000 if quick else 10000
+    df = _gen_random_walk(n=n, seed=2)
+    def indicators():
+        indicator_cache.clear()
+        ensure_indicators(df)
+    out = {"ensure_indicators.bars_per_sec": _result(n / _best(indicators, 5), "bars/s", True, bars=n)}
+    equity = pd.Series(10000 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.01, n))))
+    out["compute_metrics.calls_per_sec"] = _result(1 / _best(lambda: compute_metrics(equity), 20), "calls/s", True, bars=n)
+    rows = 100 if quick else 500
+    matrix = 10000 * np.exp(np.cumsum(np.random.default_rng(4).normal(0, 0.01, (rows, 800)), axis=1))
+    out["batch_metrics.curves_per_sec"] = _result(rows / _best(lambda: batch_metrics(matrix), 5), "curves/s", True, rows=rows)
+    return out
+
+def bench_evolve(quick: bool) -> dict:
+    import numpy as np
+    import worker
+    from app.db import SessionLocal
+    out = {}
+    for population in ((4, 16) if quick else (4, 16, 64)):
+        worker.POPULATION = population
+        with SessionLocal() as db:
+            # a fresh seeded rng per repeat: every run scores the same population
+            seconds = _best(lambda: worker.evolve_once(db, generation=0, rng=np.random.default_rng(0)), 5 if quick else 7)
+        out[f"evolve_once.latency_ms.pop{population}"] = _result(seconds * 1e3, "ms", False,
+                                                                  batch_eval=worker.BATCH_EVAL)
+    return out
+
+def bench_api(quick: bool) -> dict:
+    from fastapi.testclient import TestClient
+    from app.api import app
+    from app.db import SessionLocal
+    from app.repository import save_candidate
+    with SessionLocal() as db:
+        save_candidate(db, "bench", {"sharpe": 1.0, "max_drawdown": -0.1, "params": {}}, promote=True)
+    client = TestClient(app)
+    bar = {"open": 100.0, "high": 101.0, "low": 99.0, "close": 100.5, "volume": 150.0}
+    for _ in range(60):
+        client.post("/bars/BENCH", json=bar)
+    requests_per_endpoint = 100 if quick else 500
+    out = {}
+    for method, path in (("get", "/"), ("get", "/health"), ("get", "/metrics"), ("get", "/best_model"),
+                         ("get", "/signal/BENCH"), ("post", "/bars/BENCH")):
+        call = (lambda: client.get(path)) if method == "get" else (lambda: client.post(path, json=bar))
+        samples = []
+        for _ in range(requests_per_endpoint):
+            t0 = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - t0) * 1e3)
+        q = statistics.quantiles(samples, n=100)
+        name = f"api.{method}.{path.strip('/').replace('/', '_') or 'root'}"
+        out[name + ".p50_ms"] = _result(q[49], "ms", False)
+        out[name + ".p99_ms"] = _result(q[98], "ms", False)
+    return out
+
+SUITES = {
+    "backtest": bench_backtest,
+    "indicators": bench_indicators_metrics,
+    "evolve": bench_evolve,
+    "api": bench_api,
+}
+
+def _meta() -> dict:
+    import numpy, pandas
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "commit": commit,
+            "python": platform.python_version(), "numpy": numpy.__version__, "pandas": pandas.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+def run(args) -> int:
+    import logging
+    logging.disable(logging.INFO)
+    results = {}
+    for name in args.suite or SUITES:
+        print(f"running {name}...", file=sys.stderr)
+        results.update(SUITES[name](args.quick))
+    doc = {"meta": {**_meta(), "quick": args.quick}, "results": results}
+    text = json.dumps(doc, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+def compare(args) -> int:
+    with open(args.base) as f:
+        base = json.load(f)["results"]
+    with open(args.new) as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    for name in sorted(set(base) & set(new)):
+        b, n = base[name]["value"], new[name]["value"]
+        # change > 0 means better, whichever direction the metric goes
+        change = (n - b) / b if new[name]["higher_is_better"] else (b - n) / b
+        flag = ""
+        if change < -args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:45s} {b:14.3f} -> {n:14.3f} {new[name]['unit']:9s} {change:+7.1%}{flag}")
+    for name in sorted(set(base) ^ set(new)):
+        print(f"{name:45s} only in {'base' if name in base else 'new'}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="run the suites and print JSON results")
+    p.add_argument("--out", help="also write the results to this file")
+    p.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    p.add_argument("--suite", action="append", choices=sorted(SUITES), help="run only this suite (repeatable)")
+    p.set_defaults(fn=run)
+    p = sub.add_parser("compare", help="compare two result files; exit 1 on regression")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    p.set_defaults(fn=compare)
+    args = parser.parse_args(argv)
+    return args.fn(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
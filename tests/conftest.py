@@ -0,0 +1,18 @@
+# Shared fixtures: a throwaway SQLite database per test, configured like app.db.SessionLocal.
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models  # noqa: F401  (registers the tables on Base)
+from app.db import Base
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
@@ -0,0 +1,82 @@
+# The vectorized, batched and per-bar engines must agree bit for bit; these pin that down.
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest import _gen_random_walk
+from app.batch import batch_backtest, params_matrix
+from app.evolution import evaluate_candidate, evaluate_population, mutate
+from app.metrics import METRICS, batch_metrics, compute_metrics
+from app.strategy import (enhanced_backtest_strategy, enhanced_strategy_logic, ensure_indicators,
+                          params_config, run_backtest, signal_arrays)
+
+CONFIGS = [
+    None,
+    {'min_confidence': 0.3, 'rsi_low': 40, 'rsi_high': 60, 'min_vol_mult': 0.9},
+    {'min_confidence': 0.0, 'ema_fast': 9, 'ema_slow': 30},
+]
+
+def _same(a, b) -> bool:
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+def _population(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    parent = {'atr_stop_mult': 1.5, 'atr_take_mult': 3.0, 'risk_per_trade': 0.01, 'confidence_threshold': 0.5,
+              'ema_fast': 21, 'ema_slow': 50, 'rsi_low': 30, 'rsi_high': 70, 'htf_factor': 0}
+    return [parent] + [mutate(parent, 0.5, rng=rng) for _ in range(n - 1)]
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("htf", [None, 100.0])
+def test_signal_arrays_match_strategy_logic(seed, config, htf):
+    df = ensure_indicators(_gen_random_walk(250, seed), ema_spans=(9, 30))
+    signal, confidence = signal_arrays(df, higher_tf_close=htf, config=config)
+    for i in range(len(df)):
+        sig, meta = enhanced_strategy_logic(df, i, higher_tf_close=htf, config=config)
+        assert sig == signal[i] and meta['confidence'] == confidence[i], i
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {'risk_per_trade': 0.05, 'spread': 0.1, 'config': {'min_confidence': 0.2, 'atr_take_mult': 0.0}},
+    {'config': {'min_confidence': 0.0, 'atr_stop_mult': 0.3, 'ema_fast': 12}},
+    {'config': {'min_confidence': 0.3, 'htf_factor': 4}},
+])
+def test_run_backtest_matches_per_bar(seed, kwargs):
+    df = _gen_random_walk(300, seed)
+    fast = enhanced_backtest_strategy(df, **kwargs)
+    reference = enhanced_backtest_strategy(df, vectorized=False, **kwargs)
+    pd.testing.assert_frame_equal(fast, reference, check_exact=True)
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("max_drawdown", [None, -0.35])
+def test_batch_rows_match_run_backtest(seed, max_drawdown):
+    df = _gen_random_walk(500, seed)
+    population = _population(24, seed)
+    equity = batch_backtest(df, params_matrix(population), max_drawdown=max_drawdown)
+    for p, row in zip(population, equity):
+        single = run_backtest(df, risk_per_trade=p['risk_per_trade'], config=params_config(p),
+                              max_drawdown=max_drawdown).equity
+        assert np.array_equal(row[:len(single)], single), p
+        # an aborted run leaves a NaN tail after its stop bar
+        assert np.isnan(row[len(single):]).all()
+
+def test_evaluate_population_matches_evaluate_candidate():
+    population = _population(8, 5)
+    batched = evaluate_population(population, seed=7)
+    for p, m in zip(population, batched):
+        single = evaluate_candidate(p, seed=7)
+        assert m.keys() == single.keys() and all(_same(m[k], single[k]) for k in m), p
+
+def test_batch_metrics_match_compute_metrics():
+    rng = np.random.default_rng(0)
+    equity = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, (40, 300)), axis=1))
+    equity[5:10, 120:] = np.nan      # aborted runs of several lengths
+    equity[10, 2:] = np.nan
+    equity[11, 1:] = np.nan
+    equity[12, 50:60] = equity[12, 49]  # flat stretch
+    out = batch_metrics(equity)
+    for i, row in enumerate(equity):
+        expected = compute_metrics(pd.Series(row[~np.isnan(row)]))
+        for k in METRICS:
+            assert _same(float(out[k][i]), float(expected[k])), (i, k)
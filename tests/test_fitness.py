@@ -0,0 +1,33 @@
+# FitnessCache: LRU recency, the fitness_cache table, and invalidation by code version.
+from app import fitness
+from app.fitness import FitnessCache
+from app.metrics import json_metrics
+
+def _params(risk: float):
+    return {'atr_stop_mult': 1.5, 'atr_take_mult': 3.0, 'risk_per_trade': risk}
+
+def test_lru_evicts_least_recently_used():
+    cache = FitnessCache(max_entries=2, enabled=True)
+    a, b, c = _params(0.01), _params(0.02), _params(0.03)
+    cache.candidate(a, seed=1)
+    cache.candidate(b, seed=1)
+    cache.candidate(a, seed=1)  # a is now the most recent
+    cache.candidate(c, seed=1)  # evicts b
+    assert cache.stats() == {'hits': 1, 'db_hits': 0, 'misses': 3, 'entries': 2}
+    cache.candidate(a, seed=1)
+    cache.candidate(b, seed=1)
+    assert (cache.hits, cache.misses) == (2, 4)
+    # rounding noise below 6 significant digits is the same candidate
+    cache.candidate(_params(0.010000001), seed=1)
+    assert cache.hits == 3
+
+def test_table_is_shared_across_processes_of_one_code_version(db, monkeypatch):
+    p = _params(0.02)
+    first = FitnessCache(enabled=True).candidate(p, seed=3, db=db)
+    fresh = FitnessCache(enabled=True)  # a restarted worker: empty LRU, same table
+    assert json_metrics(fresh.candidate(p, seed=3, db=db)) == json_metrics(first)
+    assert (fresh.db_hits, fresh.misses) == (1, 0)
+    monkeypatch.setattr(fitness, "CODE_VERSION", "edited")
+    changed = FitnessCache(enabled=True)
+    assert json_metrics(changed.candidate(p, seed=3, db=db)) == json_metrics(first)
+    assert (changed.db_hits, changed.misses) == (0, 1)
@@ -0,0 +1,45 @@
+# Lease handling of the eval_jobs queue across replicas sharing one database.
+from sqlalchemy import select
+from app import jobqueue
+from app.evolution import evaluate_candidate
+from app.models import EvalJob
+
+PARAMS = {'atr_stop_mult': 1.5, 'atr_take_mult': 3.0, 'risk_per_trade': 0.01}
+
+def _job(db, job_id):
+    db.expire_all()
+    return db.scalar(select(EvalJob).where(EvalJob.id == job_id))
+
+def test_stale_worker_cannot_complete_or_fail_a_reclaimed_job(session_factory):
+    with session_factory() as a, session_factory() as b:
+        jobqueue.enqueue(a, [PARAMS], [1])
+        # A's lease is already over when it gets the job, so B may take it over
+        (lease_a,) = jobqueue.claim(a, lease=-1)
+        (lease_b,) = jobqueue.claim(b)
+        assert lease_b.id == lease_a.id and lease_b.claim != lease_a.claim and lease_b.attempts == 2
+        a.commit()  # work() commits through the fitness cache before storing results
+        assert jobqueue.complete(a, [lease_a], [{'sharpe': 9.0}]) == 0
+        jobqueue.fail(a, [lease_a], "late failure")
+        job = _job(b, lease_b.id)
+        assert (job.status, job.claim, job.error) == ("running", lease_b.claim, None)
+        assert jobqueue.complete(b, [lease_b], [{'sharpe': 1.0}]) == 1
+        job = _job(b, lease_b.id)
+        assert (job.status, job.metrics['sharpe']) == ("done", 1.0)
+
+def test_failed_job_is_retried_then_failed_for_good(db):
+    jobqueue.enqueue(db, [PARAMS], [1])
+    for attempt in (1, 2):
+        (lease,) = jobqueue.claim(db, max_attempts=2)
+        assert lease.attempts == attempt
+        jobqueue.fail(db, [lease], "boom", max_attempts=2)
+    job = _job(db, lease.id)
+    assert (job.status, job.error) == ("failed", "boom")
+    assert jobqueue.claim(db, max_attempts=2) == []
+
+def test_evaluate_distributed_keeps_input_order(db):
+    population = [dict(PARAMS, risk_per_trade=r) for r in (0.01, 0.02, 0.03)]
+    seeds = [5, 6, 7]
+    out = jobqueue.evaluate_distributed(db, population, seeds, poll=0.01)
+    expected = [evaluate_candidate(p, seed=s) for p, s in zip(population, seeds)]
+    assert [m['sharpe'] for m in out] == [m['sharpe'] for m in expected]
+    assert db.scalar(select(EvalJob.id)) is None
@@ -0,0 +1,48 @@
+# NotifyDispatcher: coalescing, retry and flush, against a fake pooled session.
+import types
+from app import notify
+from app.notify import NotifyDispatcher
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status is None:
+            raise ConnectionError("webhook down")
+        return types.SimpleNamespace(status_code=status)
+
+def _dispatcher(monkeypatch, statuses=(), **kwargs):
+    session = FakeSession(statuses)
+    monkeypatch.setattr(notify.requests, "Session", lambda: session)
+    monkeypatch.setattr(notify.random, "uniform", lambda a, b: 0.0)  # no backoff sleeps
+    return NotifyDispatcher(**kwargs), session
+
+def test_burst_goes_out_as_one_batched_post(monkeypatch):
+    d, session = _dispatcher(monkeypatch, linger=0.5)
+    for i in range(3):
+        d.submit("http://hook", {"text": f"m{i}", "extra": {}})
+    assert d.flush(timeout=5)
+    assert len(session.posts) == 1
+    url, body = session.posts[0]
+    assert url == "http://hook" and body["text"] == "m0\nm1\nm2" and len(body["extra"]["batch"]) == 3
+    assert (d.sent, d.failed) == (3, 0)
+
+def test_retries_server_errors_then_gives_up(monkeypatch):
+    d, session = _dispatcher(monkeypatch, statuses=[503, None, 200], linger=0.0, retries=3)
+    d.submit("http://hook", {"text": "promoted", "extra": {}})
+    assert d.flush(timeout=5)
+    assert len(session.posts) == 3 and session.posts[0][1] == {"text": "promoted", "extra": {}}
+    assert (d.sent, d.failed) == (1, 0)
+
+    session.statuses = [500, 429]
+    d.retries = 1
+    d.submit("http://hook", {"text": "error", "extra": {}})
+    assert d.flush(timeout=5)
+    assert len(session.posts) == 5 and (d.sent, d.failed) == (1, 1)
+
+def test_flush_without_messages_returns_at_once():
+    assert NotifyDispatcher().flush(timeout=0)
@@ -0,0 +1,36 @@
+# ReadModel serves a snapshot from memory and only goes back to the database after ttl or invalidate().
+import types
+from app import readmodel
+from app.config import StrategyConfig
+from app.readmodel import ReadModel
+from app.repository import save_candidate, save_config
+
+def test_snapshot_refreshes_after_ttl_or_invalidate(session_factory, monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(readmodel, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    model = ReadModel(ttl=5, session_factory=session_factory)
+    snap = model.snapshot()
+    assert snap["best"] is None and snap["config"] == StrategyConfig()
+
+    with session_factory() as db:
+        save_candidate(db, "v1", {"sharpe": 1.0}, promote=True)
+        save_candidate(db, "c1", {"sharpe": 2.0}, promote=False)
+    clock.now += 4
+    assert model.snapshot()["best"] is None  # still inside the ttl
+    clock.now += 1
+    assert model.snapshot()["best"]["version"] == "v1"
+
+    with session_factory() as db:
+        save_candidate(db, "v2", {"sharpe": 3.0}, promote=True)
+        save_config(db, StrategyConfig(risk_per_trade=0.02))
+    assert model.snapshot()["best"]["version"] == "v1"
+    model.invalidate()
+    snap = model.snapshot()
+    assert snap["best"]["version"] == "v2" and snap["best"]["metrics"]["sharpe"] == 3.0
+    assert snap["config"].risk_per_trade == 0.02
+
+def test_set_config_is_visible_without_a_refresh(session_factory):
+    model = ReadModel(ttl=60, session_factory=session_factory)
+    model.snapshot()
+    model.set_config(StrategyConfig(atr_stop_mult=2.5))
+    assert model.snapshot()["config"].atr_stop_mult == 2.5
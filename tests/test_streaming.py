@@ -0,0 +1,26 @@
+# StreamingIndicators fed bar by bar must reproduce ensure_indicators on the whole series.
+import json
+import numpy as np
+import pytest
+from app.backtest import _gen_random_walk
+from app.strategy import ensure_indicators
+from app.streaming import StreamingIndicators
+
+EXACT = ('ema9', 'ema30', 'rsi')
+ROLLING = ('atr', 'vol_avg')  # rolling means: equal up to summation order
+
+@pytest.mark.parametrize("seed", range(3))
+def test_streaming_matches_ensure_indicators(seed):
+    df = _gen_random_walk(300, seed)
+    expected = ensure_indicators(df, ema_spans=(9, 30))
+    state = StreamingIndicators(ema_fast=9, ema_slow=30)
+    bars = []
+    for i, row in enumerate(df[['open', 'high', 'low', 'close', 'volume']].itertuples(index=False)):
+        if i == 150:
+            # a restart in the middle of the series picks up from the JSON snapshot
+            state = StreamingIndicators.restore(json.loads(json.dumps(state.snapshot())))
+        bars.append(state.update(*row))
+    for col in EXACT:
+        assert np.array_equal([b[col] for b in bars], expected[col].to_numpy(), equal_nan=True), col
+    for col in ROLLING:
+        np.testing.assert_allclose([b[col] for b in bars], expected[col].to_numpy(), rtol=1e-12, atol=0)
@@ -1,10 +1,14 @@
-import os, time, logging, traceback
+import os, sys, time, logging, traceback
 from sqlalchemy.orm import Session
 from app.db import SessionLocal, Base, engine
 from app.repository import get_current_config, get_best_model, save_candidate
-from app.evolution import evaluate_candidate, mutate, breed
-from app.config import PROMOTE_DELTA, MAX_DRAWDOWN_LIMIT, EVOLVE_INTERVAL, POPULATION, GENERATIONS
+from app.evolution import successive_halving, mutate, breed, rank_key, sort_key
+from app.fitness import fitness_cache
+from app.robustness import robust_candidate
+from app.jobqueue import evaluate_distributed, work
+from app.config import PROMOTE_DELTA, MAX_DRAWDOWN_LIMIT, EVOLVE_INTERVAL, POPULATION, GENERATIONS, BATCH_EVAL, SEARCH_BACKEND, HALVING_RUNGS, METRICS_PORT, ROBUST_SEEDS, EVAL_QUEUE, EVAL_QUEUE_POLL
 from app.notify import notify
+from app import telemetry
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 Base.metadata.create_all(bind=engine)
 API_BASE = os.getenv("API_BASE_URL", f"http://localhost:{os.getenv('API_PORT','8000')}")
@@ -18,25 +22,58 @@ def post_reload(version: str):
     except Exception as e:
         logging.warning("Failed to notify API reload: %s", e)
 
-def evolve_once(db: Session, generation:int=0):
+def evolve_once(db: Session, generation:int=0, rng=None):
+    # rng: numpy Generator for mutate/breed (fresh entropy when None); seed it for reproducible generations
     cfg = get_current_config(db)
-    parent = {'atr_stop_mult': cfg.atr_stop_mult, 'atr_take_mult': cfg.atr_take_mult, 'risk_per_trade': cfg.risk_per_trade}
+    parent = cfg.dict()
     population=[parent]
     for _ in range(max(1, POPULATION-1)):
-        population.append(mutate(parent, scale=0.25))
-    scored=[]
-    for i,params in enumerate(population):
-        m = evaluate_candidate(params, seed=42+generation*100+i)
-        scored.append((params,m))
-    scored.sort(key=lambda x: (x[1]['sharpe'], -abs(x[1]['max_drawdown'])))
+        population.append(mutate(parent, scale=0.25, rng=rng))
+    # the child below is scored the same way as the population, so rank_key compares like with like
+    score_child = lambda child: fitness_cache.candidate(child, seed=84+generation, db=db)
+    with telemetry.stage("evaluate_population"):
+        if HALVING_RUNGS:
+            # multi-fidelity: only the top of each short rung advances to longer histories
+            scored = successive_halving(population, seed=42+generation*100,
+                                        evaluate=lambda pop, **kw: fitness_cache.population(pop, db=db, **kw))
+            bars, scenarios = HALVING_RUNGS[-1]
+            score_child = lambda child: fitness_cache.population([child], seed=42+generation*100, scenarios=scenarios,
+                                                                 bars=bars, db=db)[0]
+        elif BATCH_EVAL:
+            # one shared series per generation so the whole population runs in a single pass
+            scored = list(zip(population, fitness_cache.population(population, seed=42+generation*100, db=db)))
+            score_child = lambda child: fitness_cache.population([child], seed=42+generation*100, db=db)[0]
+        elif EVAL_QUEUE:
+            # same scores as the local path below, computed by whichever replicas claim the jobs
+            seeds = [42+generation*100+i for i in range(len(population))]
+            scored = list(zip(population, evaluate_distributed(db, population, seeds)))
+        else:
+            seeds = [42+generation*100+i for i in range(len(population))]
+            scored = list(zip(population, fitness_cache.many(population, seeds, db=db)))
+    scored.sort(key=lambda x: sort_key(x[1]))
     best_params, best_metrics = scored[-1]
     runner_params, runner_metrics = scored[-2] if len(scored)>1 else (best_params, best_metrics)
-    child = breed(best_params, runner_params)
-    child = mutate(child, scale=0.15)
-    child_metrics = evaluate_candidate(child, seed=84+generation)
-    cand_params, cand_metrics = (child, child_metrics) if child_metrics['sharpe']>best_metrics['sharpe'] else (best_params, best_metrics)
+    with telemetry.stage("breed"):
+        child = breed(best_params, runner_params, rng=rng)
+        child = mutate(child, scale=0.15, rng=rng)
+        child_metrics = score_child(child)
+    cand_params, cand_metrics = (child, child_metrics) if rank_key(child_metrics)>rank_key(best_metrics) else (best_params, best_metrics)
     return cand_params, cand_metrics
 
+def run_generation(db: Session, generation:int=0):
+    if SEARCH_BACKEND == "evolve":
+        return evolve_once(db, generation=generation)
+    from app.search import get_search
+    return get_search().run_generation(db, generation=generation)
+
+def check_eval_modes():
+    # evolve_once takes the first of HALVING_RUNGS / BATCH_EVAL / EVAL_QUEUE that is set
+    shadowed_by = [name for name, on in (("SEARCH_BACKEND=" + SEARCH_BACKEND, SEARCH_BACKEND != "evolve"),
+                                         ("HALVING_RUNGS", bool(HALVING_RUNGS)), ("BATCH_EVAL", BATCH_EVAL)) if on]
+    if EVAL_QUEUE and shadowed_by:
+        logging.warning("EVAL_QUEUE is ignored because %s is set: populations are evaluated in this process "
+                        "and evaluator replicas stay idle", " and ".join(shadowed_by))
+
 def main_loop():
     backoff=5
     while True:
@@ -48,30 +85,66 @@ def main_loop():
             champion_params=None
             champion_metrics=None
             for g in range(GENERATIONS):
-                p, m = evolve_once(db, generation=g)
+                with telemetry.stage("generation"):
+                    p, m = run_generation(db, generation=g)
+                telemetry.inc("generations_total")
                 logging.info("Gen %d candidate: params=%s metrics=%s", g, p, m)
-                if champion_metrics is None or m['sharpe']>champion_metrics['sharpe']:
+                if champion_metrics is None or rank_key(m)>rank_key(champion_metrics):
                     champion_params, champion_metrics = p, m
+            if ROBUST_SEEDS > 0:
+                with telemetry.stage("robustness"):
+                    champion_metrics = robust_candidate(champion_params, seeds=ROBUST_SEEDS, seed=int(time.time()))
+                logging.info("Champion over %d paths: sharpe %.4f (worst %.4f, std %.4f)", ROBUST_SEEDS,
+                             champion_metrics['sharpe'], champion_metrics['sharpe_min'], champion_metrics['sharpe_std'])
             improved = (champion_metrics['sharpe'] - baseline_sharpe)/(abs(baseline_sharpe)+1e-9)
             logging.info("Improvement: %.2f%%", improved*100)
-            if champion_metrics['max_drawdown'] < MAX_DRAWDOWN_LIMIT:
-                logging.warning("Rejected: drawdown %.2f below limit %.2f", champion_metrics['max_drawdown'], MAX_DRAWDOWN_LIMIT)
+            # after the robustness pass the worst path has to stay inside the limit, not just the mean
+            worst_drawdown = champion_metrics.get('max_drawdown_min', champion_metrics['max_drawdown'])
+            if champion_metrics.get('aborted') or worst_drawdown < MAX_DRAWDOWN_LIMIT:
+                logging.warning("Rejected: drawdown %.2f below limit %.2f", worst_drawdown, MAX_DRAWDOWN_LIMIT)
             elif improved > PROMOTE_DELTA:
                 version = f"v{int(time.time())}"
-                rec = save_candidate(db, version, {"params":champion_params, **champion_metrics}, promote=True)
-                notify(f"Promoted {version}", rec.metrics)
-                post_reload(version)
+                with telemetry.stage("db_write"):
+                    rec = save_candidate(db, version, {"params":champion_params, **champion_metrics}, promote=True)
+                telemetry.inc("promotions_total")
+                with telemetry.stage("notify"):
+                    notify(f"Promoted {version}", rec.metrics)
+                with telemetry.stage("reload"):
+                    post_reload(version)
             else:
                 version = f"c{int(time.time())}"
-                save_candidate(db, version, {"params":champion_params, **champion_metrics}, promote=False)
+                with telemetry.stage("db_write"):
+                    save_candidate(db, version, {"params":champion_params, **champion_metrics}, promote=False)
                 logging.info("Not promoted (%.2f%% < %.2f%%)", improved*100, PROMOTE_DELTA*100)
             db.close()
             backoff=5
         except Exception:
             logging.error("Worker error:\n%s", traceback.format_exc())
+            telemetry.inc("worker_errors_total")
             notify("Worker error", {})
             backoff=min(300, backoff*2)
         time.sleep(EVOLVE_INTERVAL if backoff==5 else backoff)
 
+def evaluator_loop():
+    # evaluation-only replica: drains eval_jobs enqueued by a main_loop worker running with EVAL_QUEUE=1
+    backoff=EVAL_QUEUE_POLL
+    while True:
+        try:
+            with SessionLocal() as db:
+                while work(db):
+                    pass
+            backoff=EVAL_QUEUE_POLL
+        except Exception:
+            logging.error("Evaluator error:\n%s", traceback.format_exc())
+            telemetry.inc("worker_errors_total")
+            backoff=min(300, max(backoff, 1)*2)
+        time.sleep(backoff)
+
 if __name__ == "__main__":
-    main_loop()
+    if METRICS_PORT:
+        telemetry.serve(METRICS_PORT)
+    if sys.argv[1:] == ["evaluate"]:
+        evaluator_loop()
+    else:
+        check_eval_modes()
+        main_loop()